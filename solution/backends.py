@@ -0,0 +1,200 @@
+"""Registry of cluster labeling backends.
+
+The pure-Python `pass1`/`pass2` implementation is kept as the readable
+reference used in the exercises. This module registers it together with
+faster engines under a name, so that `hk.hoshen_kopelman` can pick one
+by name or automatically by lattice size:
+
+- ``"reference"``: per-site Python loop (`pass1` + `pass2`)
+- ``"numpy"``: row-vectorized run labeling (`pass1_runs` + `pass2`)
+- ``"numba"``: JIT-compiled single-pass labeling (requires numba)
+- ``"scipy"``: `scipy.ndimage.label`, for comparison (requires scipy)
+
+All backends accept a neighbor stencil (`stencils.get_stencil`); the
+default is 4-connectivity. The ``"any_stencil"`` capability marks the
+backends which label arbitrary stencils, scipy only handles stencils
+within the 3 x 3 neighborhood.
+
+Backends with the ``"packed_input"`` capability label bit-packed lattices
+(`packed.PackedOccupancy`) row by row; the others are given the unpacked
+lattice. All backends return the same pair as `hk.hoshen_kopelman`: the final
+label lattice and the set of cluster labels. The actual label values may
+differ between backends, the clusters they describe do not.
+"""
+
+import numpy as np
+from pass1 import pass1
+from pass1_runs import pass1_runs
+from pass2 import pass2
+from hk_numba import hoshen_kopelman_numba, NUMBA_AVAILABLE
+from label_dtype import label_dtype
+from stencils import get_stencil, joins_runs, structure
+
+try:
+    from scipy import ndimage
+except ImportError:
+    ndimage = None
+
+
+# Below this number of sites the Python loop beats the per-row overhead
+# of the vectorized engine.
+AUTO_REFERENCE_MAX_SITES = 32 * 32
+
+BACKENDS = {}
+
+
+def register_backend(name, label, description, available=True, capabilities=(), first_pass=None):
+    """Register a labeling backend.
+
+    Parameters
+    ----------
+    name : str
+        Name used to select the backend.
+    label : callable
+        Function taking an occupancy array, an optional ``dtype`` of the
+        label lattice and an optional ``connectivity``, and returning
+        ``(labels_lattice, unique_labels)``.
+    description : str
+        One-line description shown by `list_backends`.
+    available : bool, optional
+        False if an optional dependency of the backend is missing.
+    capabilities : tuple of str, optional
+        Features of the backend, e.g. ``"merge_pairs"`` if `first_pass` is given.
+    first_pass : callable, optional
+        First pass taking the same arguments as `label` and returning
+        ``(labels_lattice, to_be_merged)`` in the format understood by `pass2`.
+    """
+    BACKENDS[name] = {
+        "name": name,
+        "label": label,
+        "description": description,
+        "available": available,
+        "capabilities": tuple(capabilities),
+        "first_pass": first_pass,
+    }
+
+
+def list_backends():
+    """List the registered backends and their capabilities.
+
+    Returns
+    -------
+    list of dict
+        One dictionary per backend with the keys ``name``, ``available``,
+        ``description`` and ``capabilities``.
+    """
+    return [
+        {key: backend[key] for key in ("name", "available", "description", "capabilities")}
+        for backend in BACKENDS.values()
+    ]
+
+
+def select_backend(shape, packed=False):
+    """Choose a backend automatically from the lattice shape.
+
+    Parameters
+    ----------
+    shape : tuple of int
+        Shape of the occupancy lattice.
+    packed : bool, optional
+        If True, the lattice is bit-packed and only backends with the
+        ``"packed_input"`` capability, which never unpack the whole
+        lattice, are considered. Default is False.
+
+    Returns
+    -------
+    str
+        Name of the selected backend.
+    """
+    if np.prod(shape) <= AUTO_REFERENCE_MAX_SITES:
+        return "reference"
+    if BACKENDS["numba"]["available"] and not packed:
+        return "numba"
+    return "numpy"
+
+
+def get_backend(name, shape=None, packed=False):
+    """Look up a backend by name.
+
+    Parameters
+    ----------
+    name : str
+        Registered backend name, or ``"auto"`` to select one by `shape`.
+    shape : tuple of int, optional
+        Lattice shape, required for ``"auto"``.
+    packed : bool, optional
+        Whether the lattice is bit-packed, used by ``"auto"``.
+
+    Returns
+    -------
+    dict
+        The backend entry as stored by `register_backend`.
+
+    Raises
+    ------
+    ValueError
+        If no backend of this name is registered.
+    ImportError
+        If the backend's optional dependency is not installed.
+    """
+    if name == "auto":
+        name = select_backend(shape, packed)
+    if name not in BACKENDS:
+        raise ValueError(f"unknown backend {name!r}, choose from {sorted(BACKENDS)}")
+    backend = BACKENDS[name]
+    if not backend["available"]:
+        raise ImportError(f"backend {name!r} is not available: {backend['description']}")
+    return backend
+
+
+def _two_pass(first_pass):
+    """Combine a first pass with `pass2` into a labeling function."""
+    def label(occ, dtype=None, connectivity=4):
+        labels_lattice, to_be_merged = first_pass(occ, dtype, connectivity)
+        return pass2(labels_lattice, to_be_merged)
+    return label
+
+
+def _label_scipy(occ, dtype=None, connectivity=4):
+    """Label clusters with `scipy.ndimage.label`."""
+    stencil = get_stencil(connectivity)
+    if structure(stencil).shape != (3, 3):
+        raise ValueError("the scipy backend only supports stencils within the 3 x 3 neighborhood")
+    occ = np.asarray(occ, dtype=bool)
+    n_labels = None if joins_runs(stencil) else occ.size
+    labels_lattice = np.empty(occ.shape, dtype=label_dtype(occ.shape, dtype, n_labels))
+    n_clusters = ndimage.label(occ, structure(stencil), output=labels_lattice)
+    return labels_lattice, set(range(1, n_clusters + 1))
+
+
+register_backend(
+    "reference", _two_pass(pass1),
+    "pure-Python per-site scan (pass1 + pass2)",
+    capabilities=("pure_python", "merge_pairs", "packed_input", "any_stencil"), first_pass=pass1,
+)
+register_backend(
+    "numpy", _two_pass(pass1_runs),
+    "row-vectorized run labeling (pass1_runs + pass2)",
+    capabilities=("vectorized", "merge_pairs", "packed_input", "any_stencil"), first_pass=pass1_runs,
+)
+register_backend(
+    "numba", hoshen_kopelman_numba,
+    "JIT-compiled single-pass labeling (requires numba)",
+    available=NUMBA_AVAILABLE, capabilities=("jit", "contiguous_labels", "any_stencil"),
+)
+register_backend(
+    "scipy", _label_scipy,
+    "scipy.ndimage.label comparator (requires scipy)",
+    available=ndimage is not None, capabilities=("comparator", "contiguous_labels"),
+)
+
+
+if __name__ == "__main__":
+    print("=== Labeling Backends ===\n")
+    for backend in list_backends():
+        status = "available" if backend["available"] else "not available"
+        print(f"{backend['name']:10s} {status:14s} {backend['description']}")
+        print(f"{'':10s} capabilities: {', '.join(backend['capabilities'])}")
+
+    for shape in ((16, 16), (256, 256)):
+        print(f"\nauto selection for {shape}: {select_backend(shape)}")
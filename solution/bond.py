@@ -0,0 +1,200 @@
+"""Bond percolation on the square lattice.
+
+In bond percolation every site is present and the bonds between nearest
+neighbors are open or closed at random; clusters are the sets of sites
+connected through open bonds. A lattice of h x w sites is described by
+two boolean arrays:
+
+- ``h_bonds`` of shape (h, w - 1): the bond between (y, x) and (y, x + 1)
+- ``v_bonds`` of shape (h - 1, w): the bond between (y, x) and (y + 1, x)
+
+Either array may be bit-packed (`packed.PackedOccupancy`), in which case
+only one row of it is unpacked at a time.
+
+The labeling uses the row scan of `pass1_runs`: the open horizontal bonds
+of a row cut it into runs of connected sites, every run gets a
+provisional label, and runs joined by an open vertical bond to a run of
+the row above are recorded for merging by `pass2`. Unlike site
+percolation on a doubled lattice, no bond is stored as a site of its
+own.
+"""
+
+import numpy as np
+from pass1_runs import label_run_bounds, row_merge_pairs
+from pass2 import pass2
+from percolate import percolates_lr, percolates_tb
+from gen_occupancy import gen_random_occupancy
+from packed import PackedOccupancy
+from label_dtype import label_dtype
+
+
+def gen_random_bonds(shape, prob, rng=np.random.default_rng(), packed=False, **kwargs):
+    """Generate random bonds of a lattice.
+
+    Parameters
+    ----------
+    shape : tuple of int
+        Shape of the site lattice (rows, cols).
+    prob : float
+        Probability that each bond is open (0 to 1).
+    rng : numpy.random.Generator, optional
+        Random number generator instance. The horizontal bonds are drawn
+        first, then the vertical ones.
+    packed : bool, optional
+        If True, return the bonds as bit-packed `packed.PackedOccupancy`
+        arrays. Default is False.
+    **kwargs
+        Further arguments of `gen_occupancy.gen_random_occupancy`.
+
+    Returns
+    -------
+    h_bonds : numpy.ndarray or PackedOccupancy
+        Open horizontal bonds, shape (rows, cols - 1).
+    v_bonds : numpy.ndarray or PackedOccupancy
+        Open vertical bonds, shape (rows - 1, cols).
+    """
+    h, w = shape
+    h_bonds = gen_random_occupancy((h, max(w - 1, 0)), prob, rng, packed=packed, **kwargs)
+    v_bonds = gen_random_occupancy((max(h - 1, 0), w), prob, rng, packed=packed, **kwargs)
+    return h_bonds, v_bonds
+
+
+def _lattice_shape(h_bonds, v_bonds):
+    """Shape of the site lattice of a pair of bond arrays."""
+    if h_bonds.shape[0] == 0:
+        raise ValueError("bond lattices need at least one row of sites")
+    shape = (h_bonds.shape[0], h_bonds.shape[1] + 1)
+    if tuple(v_bonds.shape) != (shape[0] - 1, shape[1]):
+        raise ValueError(
+            f"bonds of shapes {tuple(h_bonds.shape)} and {tuple(v_bonds.shape)} "
+            "do not belong to one lattice"
+        )
+    return shape
+
+
+def pass1_bonds(h_bonds, v_bonds, dtype=None):
+    """Perform the first pass of Hoshen-Kopelman labeling for bonds.
+
+    Parameters
+    ----------
+    h_bonds : array_like or PackedOccupancy
+        Open horizontal bonds, shape (rows, cols - 1).
+    v_bonds : array_like or PackedOccupancy
+        Open vertical bonds, shape (rows - 1, cols).
+    dtype : numpy.dtype, optional
+        Integer type of the label lattice. By default the smallest type
+        that can hold every label is chosen (see `label_dtype.label_dtype`).
+
+    Returns
+    -------
+    labels_lattice : numpy.ndarray
+        2D integer array of provisional labels of the sites.
+    to_be_merged : numpy.ndarray
+        (N, 2) integer array of label pairs that need to be merged.
+
+    Raises
+    ------
+    ValueError
+        If the shapes of the bond arrays do not fit together.
+    """
+    if not isinstance(h_bonds, PackedOccupancy):
+        h_bonds = np.asarray(h_bonds, dtype=bool)
+    if not isinstance(v_bonds, PackedOccupancy):
+        v_bonds = np.asarray(v_bonds, dtype=bool)
+    h, w = _lattice_shape(h_bonds, v_bonds)
+    # every site may be a run of its own
+    labels_lattice = np.zeros((h, w), dtype=label_dtype((h, w), dtype, h * w))
+
+    next_label = 1
+    to_be_merged = [np.empty((0, 2), dtype=np.int64)]
+    cut = np.ones(w, dtype=bool)
+
+    for y in range(h):
+        # a run starts at every site not bonded to its left neighbor
+        np.logical_not(h_bonds[y], out=cut[1:])
+        starts = np.flatnonzero(cut)
+        ends = np.append(starts[1:], w)
+        next_label += label_run_bounds(starts, ends, next_label, labels_lattice[y])
+        if y > 0:
+            bonded = np.where(v_bonds[y - 1], labels_lattice[y], 0)
+            to_be_merged.append(row_merge_pairs(bonded, labels_lattice[y - 1]))
+
+    return labels_lattice, np.concatenate(to_be_merged)
+
+
+def hoshen_kopelman_bonds(h_bonds, v_bonds, dtype=None):
+    """Label the clusters of sites connected through open bonds.
+
+    Parameters
+    ----------
+    h_bonds : array_like or PackedOccupancy
+        Open horizontal bonds, shape (rows, cols - 1).
+    v_bonds : array_like or PackedOccupancy
+        Open vertical bonds, shape (rows - 1, cols).
+    dtype : numpy.dtype, optional
+        Integer type of the label lattice, see `pass1_bonds`.
+
+    Returns
+    -------
+    labels_lattice : numpy.ndarray
+        2D integer array of cluster labels of the sites. Every site
+        belongs to a cluster, isolated sites to clusters of size 1.
+    unique_labels : set
+        Set of unique cluster labels.
+    """
+    return pass2(*pass1_bonds(h_bonds, v_bonds, dtype))
+
+
+def spans_bonds(h_bonds, v_bonds, direction="lr"):
+    """Check whether a cluster of bonded sites spans the lattice.
+
+    Parameters
+    ----------
+    h_bonds : array_like or PackedOccupancy
+        Open horizontal bonds, shape (rows, cols - 1).
+    v_bonds : array_like or PackedOccupancy
+        Open vertical bonds, shape (rows - 1, cols).
+    direction : str, optional
+        "lr" (left-right) or "tb" (top-bottom). Default is "lr".
+
+    Returns
+    -------
+    bool
+        True if at least one cluster spans in the given direction.
+
+    Raises
+    ------
+    ValueError
+        If direction is not "lr" or "tb".
+    """
+    if direction not in ("lr", "tb"):
+        raise ValueError("direction must be 'lr' or 'tb'")
+    labels_lattice, _ = hoshen_kopelman_bonds(h_bonds, v_bonds)
+    return percolates_lr(labels_lattice) if direction == "lr" else percolates_tb(labels_lattice)
+
+
+if __name__ == "__main__":
+    print("=== Bond Percolation Demo ===\n")
+
+    h_bonds = np.array((
+        (1, 0, 1, 1),
+        (0, 0, 0, 1),
+        (1, 1, 0, 0)))
+    v_bonds = np.array((
+        (0, 1, 0, 0, 1),
+        (0, 1, 1, 0, 0)))
+    labels_lattice, unique_labels = hoshen_kopelman_bonds(h_bonds, v_bonds)
+    print("Horizontal bonds:")
+    print(h_bonds)
+    print("Vertical bonds:")
+    print(v_bonds)
+    print("\nSite labels:")
+    print(labels_lattice)
+    print(f"{len(unique_labels)} clusters, spans lr: {spans_bonds(h_bonds, v_bonds, 'lr')}, "
+          f"tb: {spans_bonds(h_bonds, v_bonds, 'tb')}")
+
+    # the bond percolation threshold of the square lattice is 1/2
+    rng = np.random.default_rng(1)
+    for p in (0.4, 0.5, 0.6):
+        spanning = np.mean([spans_bonds(*gen_random_bonds((64, 64), p, rng, packed=True)) for _ in range(50)])
+        print(f"p = {p}: spanning fraction {spanning:.2f} (64 x 64, packed bonds)")
@@ -0,0 +1,202 @@
+"""Cluster properties accumulated while labeling.
+
+Sizes, extents, centroids or radii of gyration of the clusters are
+usually computed after labeling, with one scan of the label lattice per
+property (or per cluster). `hoshen_kopelman_properties` instead
+accumulates them while it labels the lattice: every label owns a set of
+accumulators (site count, min/max row and column, sums of the rows,
+columns and their squares), and when two labels are unified their
+accumulators are merged. All of these combine by addition, minimum or
+maximum, so merging is exact.
+
+With numba (and the default 4-connectivity), the accumulators are kept
+per proper label of the compiled single-pass labeling
+(`hk_numba.cluster_properties_numba`). Otherwise, they are computed in
+closed form per run of `pass1_runs` and merged by final label once the
+runs have been unified.
+
+The result is a structured array with one record per cluster, see
+`PROPERTIES_DTYPE`; `centroids` and `radius_of_gyration` derive the
+geometric quantities from it.
+"""
+
+import numpy as np
+from pass1_runs import label_run_bounds, merge_offsets, row_runs, stencil_merge_pairs
+from merge import get_representative_array
+from replace_labels import replace_labels
+from streaming import final_labels
+from packed import PackedOccupancy
+from label_dtype import label_dtype
+from hk_numba import cluster_properties_numba, NUMBA_AVAILABLE
+from stencils import get_stencil, is_default, joins_runs
+
+PROPERTIES_DTYPE = np.dtype([
+    ("label", np.int64),
+    ("size", np.int64),
+    ("row_min", np.int64),
+    ("row_max", np.int64),
+    ("col_min", np.int64),
+    ("col_max", np.int64),
+    ("sum_row", np.float64),
+    ("sum_col", np.float64),
+    ("sum_row2", np.float64),
+    ("sum_col2", np.float64),
+])
+
+_EXTENT_FIELDS = ("size", "row_min", "row_max", "col_min", "col_max")
+_MOMENT_FIELDS = ("sum_row", "sum_col", "sum_row2", "sum_col2")
+
+
+def _sum_of_squares(n):
+    """Sum of k**2 for k = 0..n."""
+    return n * (n + 1) * (2 * n + 1) / 6
+
+
+def _properties_runs(occ, dtype, stencil):
+    """Label runs like `pass1_runs` and accumulate properties per run."""
+    offsets = merge_offsets(stencil)
+    if not isinstance(occ, PackedOccupancy):
+        occ = np.asarray(occ, dtype=bool)
+    h, w = occ.shape
+    n_labels = None if joins_runs(stencil) else h * w
+    labels_lattice = np.zeros((h, w), dtype=label_dtype((h, w), dtype, n_labels))
+
+    next_label = 1
+    to_be_merged = [np.empty((0, 2), dtype=np.int64)]
+    run_rows, run_starts, run_ends = [], [], []
+
+    for y in range(h):
+        starts, ends = row_runs(occ, y, stencil)
+        next_label += label_run_bounds(starts, ends, next_label, labels_lattice[y])
+        run_rows.append(np.full(len(starts), y))
+        run_starts.append(starts)
+        run_ends.append(ends)
+        to_be_merged.extend(stencil_merge_pairs(labels_lattice, y, offsets))
+
+    representative_labels = get_representative_array(next_label - 1, np.concatenate(to_be_merged))
+    lookup, n_clusters = final_labels(representative_labels)
+    replace_labels(labels_lattice, lookup, inplace=True)
+
+    # runs were labeled 1, 2, ... in scan order
+    rows = np.concatenate(run_rows).astype(np.float64) if h else np.zeros(0)
+    starts = np.concatenate(run_starts) if h else np.zeros(0, dtype=np.int64)
+    ends = np.concatenate(run_ends) if h else np.zeros(0, dtype=np.int64)
+    clusters = lookup[1:] - 1
+    lengths = ends - starts
+
+    extent = np.empty((n_clusters, 5), dtype=np.int64)
+    extent[:, 0] = np.bincount(clusters, weights=lengths, minlength=n_clusters)
+    extent[:, 1:] = np.iinfo(np.int64).max
+    extent[:, 2::2] = -1
+    np.minimum.at(extent[:, 1], clusters, rows.astype(np.int64))
+    np.maximum.at(extent[:, 2], clusters, rows.astype(np.int64))
+    np.minimum.at(extent[:, 3], clusters, starts)
+    np.maximum.at(extent[:, 4], clusters, ends - 1)
+
+    moments = np.empty((n_clusters, 4), dtype=np.float64)
+    for i, weights in enumerate((
+        rows * lengths,
+        (starts + ends - 1) * lengths / 2,
+        rows ** 2 * lengths,
+        _sum_of_squares(ends - 1.0) - _sum_of_squares(starts - 1.0),
+    )):
+        moments[:, i] = np.bincount(clusters, weights=weights, minlength=n_clusters)
+
+    return labels_lattice, extent, moments
+
+
+def hoshen_kopelman_properties(occ, dtype=None, connectivity=4):
+    """Label connected clusters and compute their properties in one pass.
+
+    Parameters
+    ----------
+    occ : array_like or PackedOccupancy
+        2D boolean or integer array where True/non-zero indicates occupied
+        sites, or a bit-packed lattice.
+    dtype : numpy.dtype, optional
+        Integer type of the label lattice. By default the smallest type
+        that can hold every label is chosen (see `label_dtype.label_dtype`).
+    connectivity : int, str or array_like, optional
+        Neighbor stencil, see `stencils.get_stencil`. Default is 4.
+
+    Returns
+    -------
+    labels_lattice : numpy.ndarray
+        2D integer array with cluster labels 1..n (0 = unoccupied).
+    properties : numpy.ndarray
+        Structured array of `PROPERTIES_DTYPE` with one record per
+        cluster; record ``l - 1`` describes the cluster of label ``l``.
+    """
+    stencil = get_stencil(connectivity)
+    if NUMBA_AVAILABLE and is_default(stencil):
+        if isinstance(occ, PackedOccupancy):
+            occ = occ.unpack()
+        labels_lattice, extent, moments = cluster_properties_numba(occ, dtype)
+    else:
+        labels_lattice, extent, moments = _properties_runs(occ, dtype, stencil)
+
+    properties = np.zeros(len(extent), dtype=PROPERTIES_DTYPE)
+    properties["label"] = np.arange(1, len(extent) + 1)
+    for i, field in enumerate(_EXTENT_FIELDS):
+        properties[field] = extent[:, i]
+    for i, field in enumerate(_MOMENT_FIELDS):
+        properties[field] = moments[:, i]
+    return labels_lattice, properties
+
+
+def centroids(properties):
+    """Centroids of the clusters.
+
+    Parameters
+    ----------
+    properties : numpy.ndarray
+        Cluster properties as returned by `hoshen_kopelman_properties`.
+
+    Returns
+    -------
+    numpy.ndarray
+        (n, 2) float array of the mean (row, col) of each cluster.
+    """
+    return np.stack((properties["sum_row"], properties["sum_col"]), axis=1) / properties["size"][:, None]
+
+
+def radius_of_gyration(properties):
+    """Radii of gyration of the clusters.
+
+    The squared radius of gyration is the mean squared distance of the
+    sites of a cluster from its centroid.
+
+    Parameters
+    ----------
+    properties : numpy.ndarray
+        Cluster properties as returned by `hoshen_kopelman_properties`.
+
+    Returns
+    -------
+    numpy.ndarray
+        1D float array of the radius of gyration of each cluster.
+    """
+    size = properties["size"]
+    mean_square = (properties["sum_row2"] + properties["sum_col2"]) / size
+    centroid = centroids(properties)
+    return np.sqrt(np.maximum(mean_square - np.sum(centroid ** 2, axis=1), 0))
+
+
+if __name__ == "__main__":
+    print("=== Cluster Properties Demo ===\n")
+
+    occ = np.array((
+        (1, 1, 0, 0, 1),
+        (0, 1, 0, 0, 0),
+        (1, 1, 0, 0, 1),
+        (0, 0, 0, 1, 1)))
+    labels_lattice, properties = hoshen_kopelman_properties(occ)
+
+    print("Labels:")
+    print(labels_lattice)
+    print()
+    for record, centroid, r_g in zip(properties, centroids(properties), radius_of_gyration(properties)):
+        print(f"cluster {record['label']}: {record['size']} sites, "
+              f"rows {record['row_min']}..{record['row_max']}, "
+              f"cols {record['col_min']}..{record['col_max']}, "
+              f"centroid ({centroid[0]:.2f}, {centroid[1]:.2f}), R_g = {r_g:.3f}")
@@ -0,0 +1,335 @@
+"""Incremental cluster labeling of a lattice whose sites are flipped.
+
+Relabeling the whole lattice after every change of a single site costs
+O(L^2) per step. `DynamicLattice` labels the lattice once and then keeps
+its union-find state up to date:
+
+- Occupying a site joins it to the clusters of its occupied neighbors,
+  one union (amortized O(alpha)) per neighbor.
+- Vacating a site may split its cluster, but only if it had two or more
+  occupied neighbors. Searches are then started from these neighbors in
+  lockstep, one site per search and turn; searches which meet are
+  merged, and a search which runs out of sites has found a piece cut off
+  from the rest. Only such pieces are relabeled, and the search stops as
+  soon as a single search is left, so the largest piece is never
+  traversed. The cost is bounded by the number of searches times the
+  size of the pieces cut off (plus the sites visited until the other
+  searches meet), not by the size of the lattice.
+
+Every site stores a node of the union-find; the cluster label of a site
+is the root of its node. The size of each cluster and the number of its
+sites on each edge of the lattice are kept at the roots, so sizes and
+spanning status are known without scanning the lattice.
+"""
+
+from collections import deque
+
+import numpy as np
+from merge import uf_find, uf_union, flatten
+from hk import hoshen_kopelman
+from renumber_labels import renumber_labels
+
+# order of the per-cluster edge counters
+_TOP, _BOTTOM, _LEFT, _RIGHT = range(4)
+
+
+class DynamicLattice:
+    """Lattice with cluster labels kept up to date under site flips.
+
+    Parameters
+    ----------
+    occ : array_like
+        2D boolean or integer array of the initial occupancy, labeled
+        once with `hk.hoshen_kopelman`.
+
+    Attributes
+    ----------
+    shape : tuple of int
+        Shape of the lattice.
+    """
+
+    def __init__(self, occ):
+        occ = np.array(occ, dtype=bool)
+        if occ.ndim != 2:
+            raise ValueError("DynamicLattice needs a 2D occupancy array")
+        self.shape = occ.shape
+        self._occ = occ
+        self._rebuild(hoshen_kopelman(occ)[0])
+
+    def _rebuild(self, labels_lattice):
+        """Reset the union-find state to the clusters of a label lattice."""
+        unique_labels = np.unique(labels_lattice[labels_lattice != 0])
+        n_nodes = len(unique_labels) + 1
+        nodes = np.asarray(labels_lattice, dtype=np.int64)
+        self._nodes = renumber_labels(nodes, unique_labels, inplace=True)
+        # plain lists are much faster than arrays for scalar access in Python
+        self._parent = list(range(n_nodes))
+        self._size = np.bincount(self._nodes.ravel(), minlength=n_nodes).tolist()
+        edges = (self._nodes[0], self._nodes[-1], self._nodes[:, 0], self._nodes[:, -1])
+        counts = [np.bincount(edge, minlength=n_nodes).tolist() for edge in edges]
+        self._edges = [list(count) for count in zip(*counts)]
+        self._roots = set(range(1, n_nodes))
+        self._spanning = {"lr": set(), "tb": set()}
+        for root in self._roots:
+            self._update_spanning(root)
+
+    def _new_node(self, size, edges):
+        """Add a root node to the union-find."""
+        node = len(self._parent)
+        self._parent.append(node)
+        self._size.append(size)
+        self._edges.append(list(edges))
+        self._roots.add(node)
+        return node
+
+    def _site_edges(self, y, x):
+        """Edge counters of a single site."""
+        h, w = self.shape
+        return (int(y == 0), int(y == h - 1), int(x == 0), int(x == w - 1))
+
+    def _neighbors(self, y, x):
+        """Occupied nearest neighbors of a site."""
+        h, w = self.shape
+        return [
+            (ny, nx) for ny, nx in ((y - 1, x), (y + 1, x), (y, x - 1), (y, x + 1))
+            if 0 <= ny < h and 0 <= nx < w and self._occ[ny, nx]
+        ]
+
+    def _update_spanning(self, root):
+        """Add or remove a root from the sets of spanning clusters."""
+        edges = self._edges[root]
+        alive = root in self._roots
+        for direction, (first, last) in (("lr", (_LEFT, _RIGHT)), ("tb", (_TOP, _BOTTOM))):
+            if alive and edges[first] and edges[last]:
+                self._spanning[direction].add(root)
+            else:
+                self._spanning[direction].discard(root)
+
+    def _add_edges(self, root, edges, sign=1):
+        """Add (or subtract) edge counters to those of a root."""
+        counters = self._edges[root]
+        for i, count in enumerate(edges):
+            counters[i] += sign * count
+
+    def _union(self, a, b):
+        """Join the clusters of the roots `a` and `b`; return the new root."""
+        root = uf_union(self._parent, self._size, a, b)
+        merged = b if root == a else a
+        self._add_edges(root, self._edges[merged])
+        self._roots.discard(merged)
+        self._update_spanning(merged)
+        self._update_spanning(root)
+        return root
+
+    def is_occupied(self, y, x):
+        """True if the site (y, x) is occupied."""
+        return bool(self._occ[y, x])
+
+    def label(self, y, x):
+        """Cluster label of the site (y, x), 0 if it is empty.
+
+        Labels are the roots of the union-find; they stay valid until the
+        cluster is joined to another one or split, or until the nodes are
+        compacted. Compaction renumbers all labels and may happen on any
+        call of `vacate` or of `occupy` for a site without occupied
+        neighbors, so labels should not be kept across these calls.
+        """
+        node = int(self._nodes[y, x])
+        return uf_find(self._parent, node) if node else 0
+
+    def cluster_size(self, y, x):
+        """Size of the cluster of the site (y, x), 0 if it is empty."""
+        label = self.label(y, x)
+        return self._size[label] if label else 0
+
+    def occupy(self, y, x):
+        """Occupy the site (y, x) and join it to its neighbors' clusters.
+
+        Returns
+        -------
+        int
+            Label of the cluster of the site.
+        """
+        if self._occ[y, x]:
+            return self.label(y, x)
+        neighbors = self._neighbors(y, x)
+        self._occ[y, x] = True
+        edges = self._site_edges(y, x)
+
+        if not neighbors:
+            root = self._new_node(1, edges)
+            self._nodes[y, x] = root
+            self._update_spanning(root)
+            self._maybe_compact()
+            # compacting renumbers the nodes, so `root` may be stale
+            return self.label(y, x)
+
+        root = self.label(*neighbors[0])
+        self._nodes[y, x] = root
+        self._size[root] += 1
+        self._add_edges(root, edges)
+        for neighbor in neighbors[1:]:
+            other = self.label(*neighbor)
+            if other != root:
+                root = self._union(root, other)
+        self._update_spanning(root)
+        return root
+
+    def vacate(self, y, x):
+        """Vacate the site (y, x), splitting its cluster if necessary."""
+        if not self._occ[y, x]:
+            return
+        root = self.label(y, x)
+        self._occ[y, x] = False
+        self._nodes[y, x] = 0
+        self._size[root] -= 1
+        self._add_edges(root, self._site_edges(y, x), sign=-1)
+
+        neighbors = self._neighbors(y, x)
+        if not neighbors:
+            self._roots.discard(root)
+        elif len(neighbors) > 1:
+            self._split(root, neighbors)
+        self._update_spanning(root)
+        self._maybe_compact()
+
+    def flip(self, y, x):
+        """Occupy the site (y, x) if it is empty, vacate it otherwise."""
+        if self._occ[y, x]:
+            self.vacate(y, x)
+        else:
+            self.occupy(y, x)
+
+    def _split(self, root, starts):
+        """Relabel the pieces of a cluster which lost the connection to the rest.
+
+        One search per start site; searches expand one site per turn and
+        are merged when they meet. A search which runs out of sites has
+        traversed a piece of its own, which gets a new root.
+        """
+        group_of = {site: i for i, site in enumerate(starts)}
+        merged_into = list(range(len(starts)))
+        frontiers = [deque([site]) for site in starts]
+        pieces = [[site] for site in starts]
+        active = list(range(len(starts)))
+
+        while len(active) > 1:
+            for group in list(active):
+                if group not in active:
+                    continue
+                if len(active) == 1:
+                    break
+                if not frontiers[group]:
+                    self._detach(root, pieces[group])
+                    active.remove(group)
+                    continue
+                for neighbor in self._neighbors(*frontiers[group].popleft()):
+                    other = group_of.get(neighbor)
+                    if other is None:
+                        group_of[neighbor] = group
+                        pieces[group].append(neighbor)
+                        frontiers[group].append(neighbor)
+                        continue
+                    other = uf_find(merged_into, other)
+                    if other != group:
+                        merged_into[other] = group
+                        # append the shorter lists to the longer ones
+                        for lists in (frontiers, pieces):
+                            if len(lists[group]) < len(lists[other]):
+                                lists[group], lists[other] = lists[other], lists[group]
+                            lists[group].extend(lists[other])
+                        active.remove(other)
+
+    def _detach(self, root, sites):
+        """Move the sites of a cut-off piece of `root` to a new root."""
+        edges = [0, 0, 0, 0]
+        for y, x in sites:
+            for i, count in enumerate(self._site_edges(y, x)):
+                edges[i] += count
+        node = self._new_node(len(sites), edges)
+        ys, xs = np.array(sites).T
+        self._nodes[ys, xs] = node
+        self._size[root] -= len(sites)
+        self._add_edges(root, edges, sign=-1)
+        self._update_spanning(node)
+
+    def _maybe_compact(self):
+        """Renumber the nodes once unused ones outnumber the sites."""
+        if len(self._parent) > 2 * self._occ.size + 1:
+            self._rebuild(self.labels)
+
+    @property
+    def occupancy(self):
+        """Boolean occupancy of the lattice (read-only view)."""
+        view = self._occ.view()
+        view.flags.writeable = False
+        return view
+
+    @property
+    def labels(self):
+        """2D int64 array of the current cluster labels (0 = unoccupied)."""
+        return flatten(np.array(self._parent, dtype=np.int64))[self._nodes]
+
+    @property
+    def n_clusters(self):
+        """Number of clusters."""
+        return len(self._roots)
+
+    def cluster_sizes(self):
+        """Sizes of the clusters.
+
+        Returns
+        -------
+        dict
+            Mapping of each cluster label to its size.
+        """
+        return {root: self._size[root] for root in self._roots}
+
+    def spans(self, direction="lr"):
+        """Check whether a cluster spans the lattice.
+
+        Parameters
+        ----------
+        direction : str, optional
+            "lr" (left-right) or "tb" (top-bottom). Default is "lr".
+
+        Returns
+        -------
+        bool
+            True if at least one cluster spans in the given direction.
+
+        Raises
+        ------
+        ValueError
+            If direction is not "lr" or "tb".
+        """
+        if direction not in self._spanning:
+            raise ValueError("direction must be 'lr' or 'tb'")
+        return bool(self._spanning[direction])
+
+
+if __name__ == "__main__":
+    import time
+    from gen_occupancy import gen_random_occupancy
+
+    print("=== Dynamic Lattice Demo ===\n")
+
+    L, p, n_flips = 256, 0.5927, 2000
+    rng = np.random.default_rng(1)
+    lattice = DynamicLattice(gen_random_occupancy((L, L), p, rng))
+    sites = rng.integers(0, L, (n_flips, 2))
+
+    start = time.perf_counter()
+    for y, x in sites:
+        lattice.flip(y, x)
+    elapsed = time.perf_counter() - start
+    print(f"{n_flips} flips on {L} x {L}: {1e6 * elapsed / n_flips:.0f} us per flip")
+
+    hoshen_kopelman(lattice.occupancy)
+    start = time.perf_counter()
+    labels_lattice, unique_labels = hoshen_kopelman(lattice.occupancy)
+    print(f"full relabeling: {1e6 * (time.perf_counter() - start):.0f} us")
+
+    sizes = sorted(lattice.cluster_sizes().values(), reverse=True)
+    print(f"\n{lattice.n_clusters} clusters (full relabeling: {len(unique_labels)}), largest {sizes[:3]}")
+    print(f"spans lr: {lattice.spans('lr')}, tb: {lattice.spans('tb')}")
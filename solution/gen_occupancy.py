@@ -3,37 +3,110 @@
 This module provides functions to create 2D boolean arrays representing
 site occupancy on a lattice, where each site is occupied with a given
 probability.
+
+Random numbers are drawn in chunks of a fixed number of sites and written
+straight into the (boolean or bit-packed) output, so that no full-size
+float64 intermediate is ever allocated.
 """
 
 import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.colors import ListedColormap
 from plot import plot_occupancy
+from packed import PackedOccupancy
+
+# number of sites for which random numbers are drawn at a time
+CHUNK_SIZE = 1 << 20
+
+
+def _fill_occupancy(out, prob, rng, method, dtype):
+    """Fill a flat boolean array with random occupancies."""
+    if method == "float":
+        # identical to rng.random(len(out)) <= prob for the same rng state
+        np.less_equal(rng.random(len(out)), prob, out=out)
+    elif method == "integer":
+        scale = int(np.iinfo(dtype).max) + 1
+        if prob >= 1:
+            out[:] = True
+        else:
+            threshold = dtype(max(0, min(round(prob * scale), scale - 1)))
+            np.less(rng.integers(0, scale, len(out), dtype=dtype), threshold, out=out)
+    else:
+        raise ValueError("method must be 'float' or 'integer'")
 
 
-def gen_random_occupancy(shape, prob, rng=np.random.default_rng()):
+def gen_random_occupancy(
+    shape, prob, rng=np.random.default_rng(), method="float", dtype=np.uint32,
+    packed=False, chunk_size=CHUNK_SIZE, out=None,
+):
     """Generate a random occupancy grid.
 
-    Creates a 2D boolean array where each site is independently occupied
-    with probability `prob`.
+    Creates a boolean array (2D, or 3D for cubic lattices) where each site
+    is independently occupied with probability `prob`.
 
     Parameters
     ----------
     shape : tuple of int
-        Shape of the output array (rows, cols).
+        Shape of the output array, e.g. (rows, cols).
     prob : float
         Probability that each site is occupied (0 to 1).
     rng : numpy.random.Generator, optional
         Random number generator instance. Defaults to a new default generator.
+    method : str, optional
+        "float" (default) compares uniform float64 numbers with `prob`; for
+        the same rng state this gives exactly the same grid as earlier
+        versions. "integer" compares random integers of type `dtype` with
+        ``round(prob * 2**bits)``, which is faster and needs less memory
+        per chunk, at a resolution of ``2**-bits`` in `prob`.
+    dtype : numpy.dtype, optional
+        Unsigned integer type for ``method="integer"``. Default is uint32.
+    packed : bool, optional
+        If True, return a 2D grid as a bit-packed `packed.PackedOccupancy`
+        (8 sites per byte). Default is False.
+    chunk_size : int, optional
+        Number of sites drawn at a time. Default is `CHUNK_SIZE`.
+    out : numpy.ndarray, optional
+        C-contiguous boolean array of shape `shape` (e.g. a memory-mapped
+        volume) filled in place instead of allocating a new array.
 
     Returns
     -------
-    numpy.ndarray
-        Boolean array where True indicates an occupied site.
+    numpy.ndarray or PackedOccupancy
+        Boolean array where True indicates an occupied site, or the packed
+        grid if `packed` is True.
+
+    Raises
+    ------
+    ValueError
+        If `packed` is True and `shape` is not 2D, or `out` does not match
+        `shape` or is combined with `packed`.
     """
-    numbers = rng.random(shape)
-    occupancy = numbers <= prob
-    return occupancy
+    shape = tuple(np.atleast_1d(shape))
+    dtype = np.dtype(dtype).type
+    w = shape[-1]
+    rows = int(np.prod(shape[:-1]))
+
+    if out is not None:
+        if packed or out.shape != shape or out.dtype != bool or not out.flags.c_contiguous:
+            raise ValueError("out must be an unpacked, C-contiguous boolean array of the given shape")
+    if not packed:
+        occupancy = np.empty(shape, dtype=bool) if out is None else out
+        flat = occupancy.reshape(-1)
+        for start in range(0, len(flat), chunk_size):
+            _fill_occupancy(flat[start:start + chunk_size], prob, rng, method, dtype)
+        return occupancy
+
+    if len(shape) != 2:
+        raise ValueError("only 2D grids can be packed")
+    # pack whole rows at a time, so the bits of a row stay together
+    packed_rows = np.empty((rows, (w + 7) // 8), dtype=np.uint8)
+    rows_per_chunk = max(1, chunk_size // max(w, 1))
+    block = np.empty((rows_per_chunk, w), dtype=bool)
+    for start in range(0, rows, rows_per_chunk):
+        n = min(rows_per_chunk, rows - start)
+        _fill_occupancy(block[:n].reshape(-1), prob, rng, method, dtype)
+        packed_rows[start:start + n] = np.packbits(block[:n], axis=-1)
+    return PackedOccupancy(packed_rows, w)
 
 if __name__ == "__main__":
     print("=== Random Occupancy Generation Demo ===\n")
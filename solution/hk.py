@@ -16,18 +16,51 @@ from pass1 import pass1
 from pass2 import pass2
 from gen_occupancy import gen_random_occupancy
 from percolate import percolates
+from backends import get_backend, list_backends
+from tiled import hoshen_kopelman_tiled
+from packed import PackedOccupancy
+from periodic import hoshen_kopelman_periodic
+from stencils import get_stencil, is_default
+from hk3d import hoshen_kopelman_3d
 
 
-def hoshen_kopelman(occ):
+def hoshen_kopelman(occ, backend="auto", tiles=None, n_workers=None, dtype=None, periodic=False,
+                    connectivity=4):
     """Label connected clusters using the Hoshen-Kopelman algorithm.
 
     Identifies and labels all connected clusters of occupied sites on a
-    2D lattice using 4-connectivity (up, down, left, right neighbors).
+    2D lattice, by default using 4-connectivity (up, down, left, right
+    neighbors).
 
     Parameters
     ----------
-    occ : array_like
-        2D boolean or integer array where True/non-zero indicates occupied sites.
+    occ : array_like or PackedOccupancy
+        2D boolean or integer array where True/non-zero indicates occupied
+        sites, or a bit-packed lattice. Packed lattices are only unpacked
+        for backends (and tiled labeling) that cannot read them row by row.
+        A 3D array is labeled plane by plane with 6-connectivity by
+        `hk3d.hoshen_kopelman_3d` (`backend` and `n_workers` are ignored).
+    backend : str, optional
+        Name of the labeling backend (see `backends.list_backends`), or
+        "auto" (default) to choose one by lattice size.
+    tiles : int or tuple of int, optional
+        If given, the lattice is split into this many tiles along
+        (rows, cols), which are labeled in a process pool and stitched
+        together (see `tiled.hoshen_kopelman_tiled`).
+    n_workers : int, optional
+        Number of worker processes for tiled labeling. Defaults to the
+        number of CPUs.
+    dtype : numpy.dtype, optional
+        Integer type of the label lattice. By default the smallest type
+        that can hold every label is chosen (see `label_dtype.label_dtype`).
+    periodic : bool, optional
+        If True, the lattice has periodic boundaries: opposite edges are
+        neighbors (see `periodic.hoshen_kopelman_periodic`, which also
+        reports which clusters wind around the torus). Default is False.
+    connectivity : int, str or array_like, optional
+        Neighbor stencil: 4 (default), 8, "triangular" or custom offsets,
+        see `stencils.get_stencil`. Tiled and periodic labeling only
+        support 4-connectivity.
 
     Returns
     -------
@@ -36,10 +69,99 @@ def hoshen_kopelman(occ):
         Unoccupied sites have label 0.
     unique_labels : set
         Set of unique cluster labels (excluding 0).
+
+    Raises
+    ------
+    ValueError
+        If both `tiles` and `periodic` are given, or if either is combined
+        with a connectivity other than 4, or if a 3D lattice is combined
+        with any of them.
     """
-    labels_lattice, to_be_merged = pass1(occ)
-    labels_lattice, unique_labels = pass2(labels_lattice, to_be_merged)
-    return labels_lattice, unique_labels
+    packed = isinstance(occ, PackedOccupancy)
+    stencil = get_stencil(connectivity)
+    if not packed and np.ndim(occ) == 3:
+        if tiles is not None or periodic or not is_default(stencil):
+            raise ValueError("3D lattices are labeled without tiles, periodic boundaries or stencils")
+        labels_lattice, spanning = hoshen_kopelman_3d(occ, dtype=dtype)
+        return labels_lattice, set(range(1, len(spanning)))
+    if (periodic or tiles is not None) and not is_default(stencil):
+        raise ValueError("tiled and periodic labeling only support 4-connectivity")
+    if periodic:
+        if tiles is not None:
+            raise ValueError("tiled labeling does not support periodic boundaries")
+        labels_lattice, winding = hoshen_kopelman_periodic(
+            occ.unpack() if packed else occ, backend=backend, dtype=dtype
+        )
+        return labels_lattice, set(range(1, len(winding)))
+    if tiles is not None:
+        occ = occ.unpack() if packed else np.asarray(occ)
+        return hoshen_kopelman_tiled(occ, tiles, backend=backend, n_workers=n_workers, dtype=dtype)
+    if not packed:
+        occ = np.asarray(occ)
+    backend = get_backend(backend, occ.shape, packed)
+    if packed and "packed_input" not in backend["capabilities"]:
+        occ = occ.unpack()
+    return backend["label"](occ, dtype, stencil)
+
+
+def hoshen_kopelman_batch(occ_stack, direction="lr", backend="auto", dtype=None, connectivity=4):
+    """Label a stack of lattices in one call.
+
+    The B lattices are placed side by side in one wide lattice, separated
+    by empty columns (as many as the stencil reaches sideways), so that a
+    single labeling call processes each row of all lattices at once and
+    the per-call overhead is paid only once.
+
+    Parameters
+    ----------
+    occ_stack : array_like
+        3D boolean or integer array of shape (B, H, W) where True/non-zero
+        indicates occupied sites.
+    direction : str, optional
+        Direction of the spanning flags: "lr" (left-right) or "tb"
+        (top-bottom). Default is "lr".
+    backend : str, optional
+        Labeling backend, see `hoshen_kopelman`. Default is "auto".
+    dtype : numpy.dtype, optional
+        Integer type of the labels, see `hoshen_kopelman`.
+    connectivity : int, str or array_like, optional
+        Neighbor stencil, see `hoshen_kopelman`. Default is 4.
+
+    Returns
+    -------
+    labels_stack : numpy.ndarray
+        Integer array of shape (B, H, W) of cluster labels (0 = unoccupied).
+        Labels are unique across the whole stack.
+    spanning : numpy.ndarray
+        Boolean array of shape (B,), True for lattices with a spanning cluster.
+
+    Raises
+    ------
+    ValueError
+        If direction is not "lr" or "tb".
+    """
+    occ_stack = np.asarray(occ_stack, dtype=bool)
+    b, h, w = occ_stack.shape
+    stencil = get_stencil(connectivity)
+    gap = max(1, max(abs(dx) for _, dx in stencil))
+
+    side_by_side = np.zeros((h, b, w + gap), dtype=bool)
+    side_by_side[:, :, :w] = occ_stack.transpose(1, 0, 2)
+    labels_wide, _ = hoshen_kopelman(
+        side_by_side.reshape(h, b * (w + gap)), backend=backend, dtype=dtype, connectivity=stencil
+    )
+    labels_stack = np.ascontiguousarray(labels_wide.reshape(h, b, w + gap)[:, :, :w].transpose(1, 0, 2))
+
+    if direction == "lr":
+        first, last = labels_stack[:, :, 0], labels_stack[:, :, -1]
+    elif direction == "tb":
+        first, last = labels_stack[:, 0, :], labels_stack[:, -1, :]
+    else:
+        raise ValueError("direction must be 'lr' or 'tb'")
+    # labels are unique across the stack, so one intersection serves all lattices
+    spanning_labels = np.intersect1d(first[first != 0], last[last != 0])
+    spanning = np.isin(first, spanning_labels).any(axis=1)
+    return labels_stack, spanning
 
 
 def parse_args():
@@ -51,6 +173,7 @@ def parse_args():
         Parsed arguments with attributes:
         - l: Grid size (int)
         - p: Occupation probability (float)
+        - backend: Labeling backend used for the final check (str)
     """
     import argparse
 
@@ -61,6 +184,10 @@ def parse_args():
     parser.add_argument(
         "-p", type=float, default=0.3, help="probability that a site is occupied (0..1)"
     )
+    parser.add_argument(
+        "--backend", default="auto",
+        help="labeling backend: auto or one of " + ", ".join(b["name"] for b in list_backends()),
+    )
     return parser.parse_args()
 
 
@@ -92,3 +219,6 @@ if __name__ == "__main__":
     print(f"\nResult: {len(unique_labels)} clusters identified")
     print(f"Percolation: {percolates(labels_lattice)}")
 
+    _, backend_labels = hoshen_kopelman(occ, backend=args.backend)
+    print(f"Backend {args.backend!r}: {len(backend_labels)} clusters identified")
+
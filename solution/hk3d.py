@@ -0,0 +1,239 @@
+"""Hoshen-Kopelman labeling of 3D (simple cubic) lattices, plane by plane.
+
+A lattice of shape (depth, rows, cols) is scanned one plane at a time, in
+the same way as `streaming.hoshen_kopelman_memmap` scans a 2D lattice row
+by row: the sites of a plane are joined with their neighbors in the
+previous plane through a label-of-labels table, and only the labels of
+the previous plane are needed to label the next one. Provisional labels
+are written block by block to the output, which may be a memory-mapped
+``.npy`` file, and replaced by final labels in a second sequential pass.
+
+For an L = 1024 cube the occupancy takes 1 GB and the (uint32) labels
+4 GB; with both memory-mapped, the memory in use is a few blocks of
+planes and the label table.
+
+Face-to-face spanning is found without reading the labels again: the
+provisional labels of the six faces are recorded during the scan, and
+the clusters found on both faces of an axis after the final relabeling
+span the lattice along that axis.
+
+If numba is installed, each plane is labeled by the compiled
+`hk_numba.label_plane_numba`; otherwise it is labeled by a 2D backend and
+its clusters are joined with those of the previous plane
+(`streaming.adopt_labels`).
+"""
+
+import numpy as np
+from backends import get_backend
+from renumber_labels import renumber_labels
+from streaming import adopt_labels, final_labels
+from hk_numba import label_plane_numba, NUMBA_AVAILABLE
+from label_dtype import label_dtype
+
+# spanning flags of a cluster: it connects the two faces normal to axis
+# 0 (planes), 1 (rows) or 2 (columns)
+SPANS_Z, SPANS_Y, SPANS_X = 1, 2, 4
+SPANS_AXIS = (SPANS_Z, SPANS_Y, SPANS_X)
+
+
+def plane_pairs(labels, labels_below):
+    """Collect the label pairs of touching sites in two consecutive planes.
+
+    Parameters
+    ----------
+    labels : numpy.ndarray
+        2D integer labels of the current plane.
+    labels_below : numpy.ndarray
+        2D integer labels of the previous plane.
+
+    Returns
+    -------
+    numpy.ndarray
+        (N, 2) int64 array of distinct (label, label_below) pairs.
+    """
+    touching = (labels != 0) & (labels_below != 0)
+    pairs = np.stack((labels[touching], labels_below[touching]), axis=1).astype(np.int64)
+    return np.unique(pairs, axis=0)
+
+
+def label_plane(occ_plane, labels_below, out, label_of_labels, next_label):
+    """Label one plane given the provisional labels of the previous plane.
+
+    Parameters
+    ----------
+    occ_plane : array_like
+        2D boolean or integer occupancy of the plane.
+    labels_below : numpy.ndarray
+        2D integer provisional labels of the previous plane (0 = unoccupied).
+    out : numpy.ndarray
+        2D integer array the provisional labels of the plane are written to.
+    label_of_labels : numpy.ndarray
+        1D int64 label-of-labels table shared by all planes.
+    next_label : int
+        Next unused label.
+
+    Returns
+    -------
+    label_of_labels : numpy.ndarray
+        The (possibly reallocated) table.
+    next_label : int
+        Next unused label.
+    """
+    if NUMBA_AVAILABLE:
+        return label_plane_numba(occ_plane, labels_below, out, label_of_labels, next_label)
+
+    occ_plane = np.asarray(occ_plane, dtype=bool)
+    backend = get_backend("auto", occ_plane.shape)
+    local_labels, unique_labels = backend["label"](occ_plane)
+    if "contiguous_labels" not in backend["capabilities"]:
+        local_labels = renumber_labels(local_labels, sorted(unique_labels), inplace=True)
+    pairs = plane_pairs(local_labels, labels_below)
+    out[...] = local_labels
+    return adopt_labels(out, len(unique_labels), pairs, label_of_labels, next_label)
+
+
+def hoshen_kopelman_3d(occ, out_path=None, block_planes=16, dtype=None):
+    """Label connected clusters of a 3D lattice (6-connectivity).
+
+    Parameters
+    ----------
+    occ : str or array_like
+        Path of a ``.npy`` file holding a 3D boolean or integer occupancy
+        array of shape (depth, rows, cols), which is memory-mapped, or the
+        (possibly memory-mapped) array itself.
+    out_path : str, optional
+        Path of the ``.npy`` file the labels are written to. By default
+        the labels are kept in memory.
+    block_planes : int, optional
+        Number of planes read and written at a time. Default is 16.
+    dtype : numpy.dtype, optional
+        Integer type of the label lattice. By default the smallest type
+        that can hold every label is chosen (see `label_dtype.label_dtype`).
+
+    Returns
+    -------
+    labels_lattice : numpy.ndarray or numpy.memmap
+        3D integer array of cluster labels 1..n (0 = unoccupied),
+        memory-mapped if `out_path` is given.
+    spanning : numpy.ndarray
+        1D int64 array of length n + 1; entry l combines the flags
+        `SPANS_Z`, `SPANS_Y` and `SPANS_X` of the axes along which
+        cluster l connects the two opposite faces of the lattice.
+
+    Raises
+    ------
+    ValueError
+        If the occupancy is not 3D.
+    """
+    if isinstance(occ, str):
+        occ = np.load(occ, mmap_mode="r")
+    if np.ndim(occ) != 3:
+        raise ValueError("hoshen_kopelman_3d needs a 3D occupancy array")
+    shape = tuple(occ.shape)
+    d, h, w = shape
+    dtype = label_dtype(shape, dtype)
+    if out_path is None:
+        labels_lattice = np.zeros(shape, dtype=dtype)
+    else:
+        labels_lattice = np.lib.format.open_memmap(out_path, mode="w+", dtype=dtype, shape=shape)
+    if labels_lattice.size == 0:
+        return labels_lattice, np.zeros(1, dtype=np.int64)
+
+    label_of_labels = np.zeros(h * w + 1, dtype=np.int64)
+    next_label = 1
+    labels_below = np.zeros((h, w), dtype=dtype)
+    # provisional labels of the low and high face along each axis
+    faces = (
+        [None, None],
+        [np.empty((d, w), dtype=dtype), np.empty((d, w), dtype=dtype)],
+        [np.empty((d, h), dtype=dtype), np.empty((d, h), dtype=dtype)],
+    )
+
+    # 1st pass: provisional labels, block by block
+    for z0 in range(0, d, block_planes):
+        occ_block = np.asarray(occ[z0:z0 + block_planes], dtype=bool)
+        labels_block = np.empty(occ_block.shape, dtype=dtype)
+        for z, (occ_plane, labels) in enumerate(zip(occ_block, labels_block), start=z0):
+            label_of_labels, next_label = label_plane(
+                occ_plane, labels_below, labels, label_of_labels, next_label
+            )
+            faces[1][0][z], faces[1][1][z] = labels[0], labels[-1]
+            faces[2][0][z], faces[2][1][z] = labels[:, 0], labels[:, -1]
+            if z == 0:
+                faces[0][0] = labels.copy()
+            labels_below = labels
+        labels_lattice[z0:z0 + block_planes] = labels_block
+        labels_below = labels_below.copy()
+    faces[0][1] = labels_below
+
+    # 2nd pass: final labels, block by block
+    lookup, n_clusters = final_labels(label_of_labels[:next_label])
+    lookup = lookup.astype(dtype)
+    for z0 in range(0, d, block_planes):
+        labels_lattice[z0:z0 + block_planes] = lookup[labels_lattice[z0:z0 + block_planes]]
+    if out_path is not None:
+        labels_lattice.flush()
+
+    spanning = np.zeros(n_clusters + 1, dtype=np.int64)
+    for flag, (low, high) in zip(SPANS_AXIS, faces):
+        both = np.intersect1d(lookup[low], lookup[high])
+        spanning[both[both != 0]] |= flag
+    return labels_lattice, spanning
+
+
+def spans_3d(spanning, axis="any"):
+    """Check whether any cluster connects opposite faces of a 3D lattice.
+
+    Parameters
+    ----------
+    spanning : numpy.ndarray
+        Spanning flags of the clusters, as returned by `hoshen_kopelman_3d`.
+    axis : int or str, optional
+        0, 1 or 2 for the faces normal to that axis, "any" (some pair of
+        faces) or "all" (one cluster spans along all three axes).
+        Default is "any".
+
+    Returns
+    -------
+    bool
+        True if a cluster spans in the given way.
+
+    Raises
+    ------
+    ValueError
+        If axis is unknown.
+    """
+    if axis == "any":
+        return bool(np.any(spanning))
+    if axis == "all":
+        return bool(np.any(spanning == SPANS_Z | SPANS_Y | SPANS_X))
+    if axis in (0, 1, 2):
+        return bool(np.any(spanning & SPANS_AXIS[axis]))
+    raise ValueError("axis must be 0, 1, 2, 'any' or 'all'")
+
+
+if __name__ == "__main__":
+    import os
+    import tempfile
+    from gen_occupancy import gen_random_occupancy
+
+    print("=== 3D Hoshen-Kopelman Demo ===\n")
+
+    # the site percolation threshold of the simple cubic lattice
+    p_c = 0.3116
+    rng = np.random.default_rng(1)
+    L = 64
+    with tempfile.TemporaryDirectory() as tmp:
+        occ_path = os.path.join(tmp, "occ.npy")
+        occ = np.lib.format.open_memmap(occ_path, mode="w+", dtype=bool, shape=(L, L, L))
+        gen_random_occupancy((L, L, L), p_c, rng, out=occ)
+        occ.flush()
+        del occ
+
+        labels_lattice, spanning = hoshen_kopelman_3d(occ_path, os.path.join(tmp, "labels.npy"))
+        sizes = np.bincount(np.asarray(labels_lattice).ravel())[1:]
+        print(f"{L}^3 lattice at p = {p_c}: {len(spanning) - 1} clusters, "
+              f"largest {sizes.max()} sites ({labels_lattice.dtype} labels)")
+        for axis in (0, 1, 2, "any", "all"):
+            print(f"  spans along {axis}: {spans_3d(spanning, axis)}")
+        del labels_lattice
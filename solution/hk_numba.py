@@ -0,0 +1,482 @@
+"""JIT-compiled Hoshen-Kopelman labeling using Numba.
+
+This module provides a compiled version of the single-pass
+Hoshen-Kopelman algorithm with a label-of-labels table (see
+`pass1.pass1_proper_labels`), a variant accumulating cluster properties
+(see `cluster_properties`), a compiled early-exit spanning check (see
+`percolate.spans`), and the plane-by-plane labeling of 3D lattices (see
+`hk3d`). Numba is an optional dependency: if it is not
+installed, `NUMBA_AVAILABLE` is False and calling the public functions
+of this module raises an ImportError.
+"""
+
+import numpy as np
+from merge import uf_find
+from label_dtype import label_dtype
+from stencils import get_stencil, is_default, joins_runs
+from streaming import grow_table
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+NUMBA_AVAILABLE = numba is not None
+
+
+def _label(occ, labels_lattice):
+    """Label clusters of a 2D boolean array with contiguous labels 1..n.
+
+    `labels_lattice` is a zero-initialized integer array of the same shape.
+    """
+    h, w = occ.shape
+    label_of_labels = np.zeros((h * w + 1) // 2 + 2, dtype=np.int64)
+    next_label = 1
+
+    for y in range(h):
+        for x in range(w):
+            if not occ[y, x]:
+                continue
+
+            up = labels_lattice[y - 1, x] if y > 0 else 0
+            left = labels_lattice[y, x - 1] if x > 0 else 0
+
+            if up == 0 and left == 0:
+                label_of_labels[next_label] = next_label
+                labels_lattice[y, x] = next_label
+                next_label += 1
+            elif left == 0:
+                labels_lattice[y, x] = _find(label_of_labels, up)
+            elif up == 0:
+                labels_lattice[y, x] = _find(label_of_labels, left)
+            else:
+                up = _find(label_of_labels, up)
+                left = _find(label_of_labels, left)
+                proper = min(up, left)
+                label_of_labels[max(up, left)] = proper
+                labels_lattice[y, x] = proper
+
+    return labels_lattice, _number_clusters(labels_lattice, label_of_labels, next_label)
+
+
+def _label_stencil(occ, labels_lattice, offsets, n_labels):
+    """Label clusters for any stencil of backward offsets (k, 2).
+
+    Every site takes the proper label of its first labeled neighbor, and
+    the proper labels of all its labeled neighbors are unified.
+    `n_labels` bounds the number of provisional labels.
+    """
+    h, w = occ.shape
+    label_of_labels = np.zeros(n_labels + 2, dtype=np.int64)
+    next_label = 1
+
+    for y in range(h):
+        for x in range(w):
+            if not occ[y, x]:
+                continue
+
+            proper = 0
+            for k in range(offsets.shape[0]):
+                ny = y + offsets[k, 0]
+                nx = x + offsets[k, 1]
+                if ny < 0 or nx < 0 or nx >= w or labels_lattice[ny, nx] == 0:
+                    continue
+                neighbor = _find(label_of_labels, labels_lattice[ny, nx])
+                if proper == 0:
+                    proper = neighbor
+                elif neighbor != proper:
+                    label_of_labels[max(proper, neighbor)] = min(proper, neighbor)
+                    proper = min(proper, neighbor)
+
+            if proper == 0:
+                proper = next_label
+                label_of_labels[proper] = proper
+                next_label += 1
+            labels_lattice[y, x] = proper
+
+    return labels_lattice, _number_clusters(labels_lattice, label_of_labels, next_label)
+
+
+def _number_clusters(labels_lattice, label_of_labels, next_label):
+    """Replace the provisional labels by contiguous final labels 1..n."""
+    h, w = labels_lattice.shape
+    # proper labels are always smaller than the labels merged into them,
+    # so a single ascending sweep numbers the clusters contiguously
+    final = np.zeros(next_label, dtype=np.int64)
+    n_clusters = 0
+    for label in range(1, next_label):
+        proper = _find(label_of_labels, label)
+        if proper == label:
+            n_clusters += 1
+            final[label] = n_clusters
+        else:
+            final[label] = final[proper]
+
+    for y in range(h):
+        for x in range(w):
+            labels_lattice[y, x] = final[labels_lattice[y, x]]
+
+    return n_clusters
+
+
+def _grow(table, n_rows):
+    """Return `table` if it has more than `n_rows` rows, else a larger copy."""
+    if n_rows < table.shape[0]:
+        return table
+    grown = np.empty((max(n_rows + 1, 2 * table.shape[0]), table.shape[1]), dtype=table.dtype)
+    grown[:table.shape[0]] = table
+    return grown
+
+
+def _add_site(extent, moments, label, y, x):
+    """Add the site (y, x) to the accumulators of a proper label."""
+    extent[label, 0] += 1
+    extent[label, 1] = min(extent[label, 1], y)
+    extent[label, 2] = max(extent[label, 2], y)
+    extent[label, 3] = min(extent[label, 3], x)
+    extent[label, 4] = max(extent[label, 4], x)
+    moments[label, 0] += y
+    moments[label, 1] += x
+    moments[label, 2] += y * y
+    moments[label, 3] += x * x
+
+
+def _label_properties(occ, labels_lattice):
+    """Label clusters like `_label` and accumulate their properties.
+
+    Every proper label owns a row of accumulators: `extent` holds the
+    site count and the min/max row and column, `moments` the sums of the
+    rows, columns and their squares. When two proper labels are unified,
+    the accumulators of the larger label are merged into the smaller one.
+    """
+    h, w = occ.shape
+    label_of_labels = np.zeros((h * w + 1) // 2 + 2, dtype=np.int64)
+    extent = np.zeros((w + 2, 5), dtype=np.int64)
+    moments = np.zeros((w + 2, 4), dtype=np.float64)
+    next_label = 1
+
+    for y in range(h):
+        for x in range(w):
+            if not occ[y, x]:
+                continue
+
+            up = labels_lattice[y - 1, x] if y > 0 else 0
+            left = labels_lattice[y, x - 1] if x > 0 else 0
+
+            if up == 0 and left == 0:
+                proper = next_label
+                label_of_labels[proper] = proper
+                extent = _grow(extent, proper)
+                moments = _grow(moments, proper)
+                extent[proper, 0] = 0
+                extent[proper, 1] = y
+                extent[proper, 2] = y
+                extent[proper, 3] = x
+                extent[proper, 4] = x
+                moments[proper, :] = 0.0
+                next_label += 1
+            elif left == 0:
+                proper = _find(label_of_labels, up)
+            elif up == 0:
+                proper = _find(label_of_labels, left)
+            else:
+                up = _find(label_of_labels, up)
+                left = _find(label_of_labels, left)
+                proper = min(up, left)
+                merged = max(up, left)
+                if merged != proper:
+                    label_of_labels[merged] = proper
+                    extent[proper, 0] += extent[merged, 0]
+                    extent[proper, 1] = min(extent[proper, 1], extent[merged, 1])
+                    extent[proper, 2] = max(extent[proper, 2], extent[merged, 2])
+                    extent[proper, 3] = min(extent[proper, 3], extent[merged, 3])
+                    extent[proper, 4] = max(extent[proper, 4], extent[merged, 4])
+                    moments[proper, :] += moments[merged, :]
+            labels_lattice[y, x] = proper
+            _add_site(extent, moments, proper, y, x)
+
+    # number the clusters contiguously as in `_label`, moving their
+    # accumulators to the row of the final label
+    final = np.zeros(next_label, dtype=np.int64)
+    n_clusters = 0
+    for label in range(1, next_label):
+        proper = _find(label_of_labels, label)
+        if proper == label:
+            n_clusters += 1
+            final[label] = n_clusters
+            extent[n_clusters] = extent[label]
+            moments[n_clusters] = moments[label]
+        else:
+            final[label] = final[proper]
+
+    for y in range(h):
+        for x in range(w):
+            labels_lattice[y, x] = final[labels_lattice[y, x]]
+
+    return labels_lattice, extent[1:n_clusters + 1].copy(), moments[1:n_clusters + 1].copy()
+
+
+def _join(label_of_labels, proper, neighbor):
+    """Unify the proper label of a site with the label of a neighbor.
+
+    Returns the new proper label of the site (0 if neither is labeled).
+    """
+    if neighbor == 0:
+        return proper
+    neighbor = _find(label_of_labels, neighbor)
+    if proper == 0 or proper == neighbor:
+        return neighbor
+    label_of_labels[max(proper, neighbor)] = min(proper, neighbor)
+    return min(proper, neighbor)
+
+
+def _label_plane(occ, labels_below, labels_plane, label_of_labels, next_label):
+    """Label one plane of a 3D lattice given the labels of the plane below.
+
+    Every site is joined with its neighbors in the plane below, above it
+    and to its left. The label-of-labels table is grown as needed.
+    """
+    h, w = occ.shape
+    for y in range(h):
+        for x in range(w):
+            if not occ[y, x]:
+                labels_plane[y, x] = 0
+                continue
+
+            proper = _join(label_of_labels, 0, labels_below[y, x])
+            if y > 0:
+                proper = _join(label_of_labels, proper, labels_plane[y - 1, x])
+            if x > 0:
+                proper = _join(label_of_labels, proper, labels_plane[y, x - 1])
+            if proper == 0:
+                label_of_labels = grow_table(label_of_labels, next_label + 1)
+                label_of_labels[next_label] = next_label
+                proper = next_label
+                next_label += 1
+            labels_plane[y, x] = proper
+
+    return label_of_labels, next_label
+
+
+def _spans_lr(occ):
+    """Check for a left-right spanning cluster keeping only two label rows."""
+    h, w = occ.shape
+    # labels 1 and 2 are the virtual left and right edge nodes
+    label_of_labels = np.zeros((h * w + 1) // 2 + 3, dtype=np.int64)
+    label_of_labels[1] = 1
+    label_of_labels[2] = 2
+    next_label = 3
+    labels = np.zeros(w, dtype=np.int64)
+    labels_above = np.zeros(w, dtype=np.int64)
+
+    for y in range(h):
+        for x in range(w):
+            if not occ[y, x]:
+                labels[x] = 0
+                continue
+
+            up = labels_above[x]
+            left = labels[x - 1] if x > 0 else 0
+
+            if up == 0 and left == 0:
+                label_of_labels[next_label] = next_label
+                labels[x] = next_label
+                next_label += 1
+            elif left == 0:
+                labels[x] = _find(label_of_labels, up)
+            elif up == 0:
+                labels[x] = _find(label_of_labels, left)
+            else:
+                up = _find(label_of_labels, up)
+                left = _find(label_of_labels, left)
+                proper = min(up, left)
+                label_of_labels[max(up, left)] = proper
+                labels[x] = proper
+
+        for edge, x in ((1, 0), (2, w - 1)):
+            if labels[x] != 0:
+                a = _find(label_of_labels, edge)
+                b = _find(label_of_labels, labels[x])
+                label_of_labels[max(a, b)] = min(a, b)
+        if _find(label_of_labels, 1) == _find(label_of_labels, 2):
+            return True
+        labels, labels_above = labels_above, labels
+
+    return False
+
+
+if NUMBA_AVAILABLE:
+    _find = numba.njit(cache=True)(uf_find)
+    _number_clusters = numba.njit(cache=True)(_number_clusters)
+    _label = numba.njit(cache=True)(_label)
+    _label_stencil = numba.njit(cache=True)(_label_stencil)
+    _grow = numba.njit(cache=True)(_grow)
+    _add_site = numba.njit(cache=True)(_add_site)
+    _label_properties = numba.njit(cache=True)(_label_properties)
+    _spans_lr = numba.njit(cache=True)(_spans_lr)
+    grow_table = numba.njit(cache=True)(grow_table)
+    _join = numba.njit(cache=True)(_join)
+    _label_plane = numba.njit(cache=True)(_label_plane)
+
+
+def hoshen_kopelman_numba(occ, dtype=None, connectivity=4):
+    """Label connected clusters with the JIT-compiled Hoshen-Kopelman algorithm.
+
+    Parameters
+    ----------
+    occ : array_like
+        2D boolean or integer array where True/non-zero indicates occupied sites.
+    dtype : numpy.dtype, optional
+        Integer type of the label lattice. By default the smallest type
+        that can hold every label is chosen (see `label_dtype.label_dtype`).
+    connectivity : int, str or array_like, optional
+        Neighbor stencil, see `stencils.get_stencil`. Default is 4.
+
+    Returns
+    -------
+    labels_lattice : numpy.ndarray
+        2D integer array with cluster labels 1..n (0 = unoccupied).
+    unique_labels : set
+        Set of unique cluster labels (excluding 0).
+
+    Raises
+    ------
+    ImportError
+        If Numba is not installed.
+    """
+    if not NUMBA_AVAILABLE:
+        raise ImportError("hoshen_kopelman_numba requires numba")
+    occ = np.ascontiguousarray(occ, dtype=bool)
+    stencil = get_stencil(connectivity)
+    if is_default(stencil):
+        labels_lattice = np.zeros(occ.shape, dtype=label_dtype(occ.shape, dtype))
+        labels_lattice, n_clusters = _label(occ, labels_lattice)
+    else:
+        # without horizontal neighbors every site may start a cluster
+        n_labels = (occ.shape[0] * ((occ.shape[1] + 1) // 2) if joins_runs(stencil) else occ.size)
+        labels_lattice = np.zeros(occ.shape, dtype=label_dtype(occ.shape, dtype, n_labels))
+        offsets = np.array(stencil, dtype=np.int64)
+        labels_lattice, n_clusters = _label_stencil(occ, labels_lattice, offsets, n_labels)
+    return labels_lattice, set(range(1, n_clusters + 1))
+
+
+def cluster_properties_numba(occ, dtype=None):
+    """JIT-compiled labeling with cluster property accumulation.
+
+    Parameters
+    ----------
+    occ : array_like
+        2D boolean or integer array where True/non-zero indicates occupied sites.
+    dtype : numpy.dtype, optional
+        Integer type of the label lattice, see `hoshen_kopelman_numba`.
+
+    Returns
+    -------
+    labels_lattice : numpy.ndarray
+        2D integer array with cluster labels 1..n (0 = unoccupied).
+    extent : numpy.ndarray
+        (n, 5) int64 array of the site count and the min/max row and
+        column of each cluster.
+    moments : numpy.ndarray
+        (n, 4) float64 array of the sums of the rows, columns, squared
+        rows and squared columns of the sites of each cluster.
+
+    Raises
+    ------
+    ImportError
+        If Numba is not installed.
+    """
+    if not NUMBA_AVAILABLE:
+        raise ImportError("cluster_properties_numba requires numba")
+    occ = np.ascontiguousarray(occ, dtype=bool)
+    labels_lattice = np.zeros(occ.shape, dtype=label_dtype(occ.shape, dtype))
+    return _label_properties(occ, labels_lattice)
+
+
+def spans_numba(occ, direction="lr"):
+    """JIT-compiled version of `percolate.spans`.
+
+    Parameters
+    ----------
+    occ : array_like
+        2D boolean or integer array where True/non-zero indicates occupied sites.
+    direction : str, optional
+        "lr" (left-right) or "tb" (top-bottom). Default is "lr".
+
+    Returns
+    -------
+    bool
+        True if at least one cluster spans in the given direction.
+
+    Raises
+    ------
+    ImportError
+        If Numba is not installed.
+    ValueError
+        If direction is not "lr" or "tb".
+    """
+    if not NUMBA_AVAILABLE:
+        raise ImportError("spans_numba requires numba")
+    occ = np.asarray(occ, dtype=bool)
+    if direction == "tb":
+        occ = occ.T
+    elif direction != "lr":
+        raise ValueError("direction must be 'lr' or 'tb'")
+    if occ.size == 0:
+        return False
+    return bool(_spans_lr(np.ascontiguousarray(occ)))
+
+
+def label_plane_numba(occ_plane, labels_below, out, label_of_labels, next_label):
+    """JIT-compiled labeling of one plane of a 3D lattice (see `hk3d`).
+
+    Parameters
+    ----------
+    occ_plane : array_like
+        2D boolean or integer occupancy of the plane.
+    labels_below : numpy.ndarray
+        2D integer provisional labels of the previous plane (0 = unoccupied).
+    out : numpy.ndarray
+        2D integer array the provisional labels of the plane are written to.
+    label_of_labels : numpy.ndarray
+        1D int64 label-of-labels table shared by all planes.
+    next_label : int
+        Next unused label.
+
+    Returns
+    -------
+    label_of_labels : numpy.ndarray
+        The (possibly reallocated) table.
+    next_label : int
+        Next unused label.
+
+    Raises
+    ------
+    ImportError
+        If Numba is not installed.
+    """
+    if not NUMBA_AVAILABLE:
+        raise ImportError("label_plane_numba requires numba")
+    occ_plane = np.ascontiguousarray(occ_plane, dtype=bool)
+    label_of_labels, next_label = _label_plane(occ_plane, labels_below, out, label_of_labels, next_label)
+    return label_of_labels, int(next_label)
+
+
+if __name__ == "__main__":
+    print("=== Hoshen-Kopelman (Numba) Demo ===\n")
+    print(f"Numba available: {NUMBA_AVAILABLE}")
+
+    occ = np.array((
+        (1, 1, 0, 0, 1),
+        (0, 1, 0, 0, 0),
+        (1, 1, 0, 0, 1),
+        (0, 0, 0, 1, 1)))
+    print("Occupancy grid:")
+    print(occ)
+
+    if NUMBA_AVAILABLE:
+        labels_lattice, unique_labels = hoshen_kopelman_numba(occ)
+        print("\nFinal labels:")
+        print(labels_lattice)
+        print(f"Clusters: {unique_labels}")
+        print(f"Spans lr: {spans_numba(occ, 'lr')}, spans tb: {spans_numba(occ, 'tb')}")
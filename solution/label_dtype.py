@@ -0,0 +1,81 @@
+"""Integer type of label lattices.
+
+Label lattices used to be int64, eight bytes per site. The number of
+provisional labels is bounded by the lattice shape, though: a new label
+is only handed out for a site (or run) whose left neighbor is empty, so
+a row of w sites starts at most ceil(w / 2) labels. `label_dtype` picks
+the smallest unsigned type holding that bound, which for lattices of up
+to about 360 x 360 sites is uint16 and up to about 90000 x 90000 sites
+uint32.
+"""
+
+import numpy as np
+
+# candidate label types, from the smallest
+LABEL_DTYPES = (np.uint16, np.uint32, np.int64)
+
+
+def max_labels(shape):
+    """Upper bound of the number of provisional labels of a lattice.
+
+    Parameters
+    ----------
+    shape : tuple of int
+        Shape of the lattice; rows run along the last axis.
+
+    Returns
+    -------
+    int
+        Largest label any of the labeling engines can hand out.
+    """
+    shape = tuple(int(n) for n in shape)
+    if not shape:
+        return 0
+    return int(np.prod(shape[:-1], dtype=object)) * ((shape[-1] + 1) // 2)
+
+
+def label_dtype(shape, dtype=None, n_labels=None):
+    """Choose the integer type of the label lattice of a lattice.
+
+    Parameters
+    ----------
+    shape : tuple of int
+        Shape of the lattice.
+    dtype : numpy.dtype, optional
+        Requested type. By default, the smallest of `LABEL_DTYPES` that
+        can hold `n_labels` is chosen.
+    n_labels : int, optional
+        Number of labels the type must hold. Defaults to `max_labels`;
+        engines which label single sites rather than runs pass the
+        number of sites.
+
+    Returns
+    -------
+    numpy.dtype
+        The label type.
+
+    Raises
+    ------
+    ValueError
+        If `dtype` is not an integer type or too small for the lattice.
+    """
+    if n_labels is None:
+        n_labels = max_labels(shape)
+    if dtype is None:
+        # the largest candidate if none fits, which is rejected below
+        dtype = next(
+            (candidate for candidate in LABEL_DTYPES if n_labels <= np.iinfo(candidate).max),
+            LABEL_DTYPES[-1],
+        )
+    dtype = np.dtype(dtype)
+    if not np.issubdtype(dtype, np.integer):
+        raise ValueError(f"label dtype must be an integer type, got {dtype}")
+    if n_labels > np.iinfo(dtype).max:
+        raise ValueError(f"label dtype {dtype} cannot hold {n_labels} labels")
+    return dtype
+
+
+if __name__ == "__main__":
+    print("=== Label dtype Demo ===\n")
+    for shape in ((16, 16), (256, 256), (362, 362), (4096, 4096), (100000, 100000)):
+        print(f"{shape}: up to {max_labels(shape)} labels -> {label_dtype(shape)}")
@@ -1,11 +1,14 @@
 """Cluster merging utilities using union-find data structure.
 
 This module provides functions to merge cluster labels that belong to
-the same connected component, using NetworkX's UnionFind implementation.
+the same connected component. Labels are merged with an array-backed
+union-find (parent and size arrays indexed by label), so that resolving
+hundreds of thousands of provisional labels does not require a Python
+object per label.
 """
 
+import numpy as np
 import matplotlib.pyplot as plt
-import networkx as nx
 
 
 def draw_cluster_identities(unique_labels, to_be_merged, fname=None):
@@ -23,6 +26,8 @@ def draw_cluster_identities(unique_labels, to_be_merged, fname=None):
     fname : str, optional
         If provided, saves the figure to this filename.
     """
+    import networkx as nx
+
     G = nx.Graph()
     G.add_nodes_from(unique_labels)
     G.add_edges_from(to_be_merged)
@@ -34,6 +39,116 @@ def draw_cluster_identities(unique_labels, to_be_merged, fname=None):
     plt.show()
 
 
+def uf_find(parent, a):
+    """Find the root of label `a`, compressing the path on the way.
+
+    Parameters
+    ----------
+    parent : numpy.ndarray or list
+        1D integer array with ``parent[l]`` the parent of label ``l``.
+        Roots satisfy ``parent[l] == l``. Modified in place.
+    a : int
+        Label whose root is requested.
+
+    Returns
+    -------
+    int
+        Root (representative) label of `a`.
+    """
+    root = a
+    while parent[root] != root:
+        root = parent[root]
+    while parent[a] != root:
+        parent[a], a = root, parent[a]
+    return root
+
+
+def uf_union(parent, size, a, b):
+    """Merge the sets containing labels `a` and `b` (union by size).
+
+    Parameters
+    ----------
+    parent : numpy.ndarray or list
+        1D integer parent array, modified in place.
+    size : numpy.ndarray or list
+        1D integer array holding the set size at each root, modified in place.
+    a, b : int
+        Labels to merge.
+
+    Returns
+    -------
+    int
+        Root of the merged set.
+    """
+    ra = uf_find(parent, a)
+    rb = uf_find(parent, b)
+    if ra == rb:
+        return ra
+    if size[ra] < size[rb]:
+        ra, rb = rb, ra
+    parent[rb] = ra
+    size[ra] += size[rb]
+    return ra
+
+
+def flatten(parent):
+    """Point every label directly at its root.
+
+    Uses vectorized pointer jumping, so the returned array can be used as
+    a dense label -> representative lookup table.
+
+    Parameters
+    ----------
+    parent : numpy.ndarray
+        1D integer parent array.
+
+    Returns
+    -------
+    numpy.ndarray
+        Array of the same shape with ``result[l]`` the root of ``l``.
+    """
+    parent = np.asarray(parent)
+    while True:
+        grandparent = parent[parent]
+        if np.array_equal(grandparent, parent):
+            return parent
+        parent = grandparent
+
+
+def get_representative_array(n_labels, to_be_merged):
+    """Compute a dense label -> representative lookup array.
+
+    Parameters
+    ----------
+    n_labels : int
+        Largest label in use. Labels are assumed to be ``1..n_labels``;
+        label 0 (unoccupied) always maps to itself.
+    to_be_merged : array_like
+        (N, 2) integer array (or list of pairs) of labels to merge.
+
+    Returns
+    -------
+    numpy.ndarray
+        1D int64 array of length ``n_labels + 1`` where entry ``l`` is the
+        representative label of ``l``.
+    """
+    pairs = np.asarray(to_be_merged, dtype=np.int64).reshape(-1, 2)
+    if len(pairs):
+        # the same conflict is typically recorded many times
+        lo, hi = pairs.min(axis=1), pairs.max(axis=1)
+        keys = np.unique(lo[lo != hi] * (n_labels + 1) + hi[lo != hi])
+        pairs = np.stack(np.divmod(keys, n_labels + 1), axis=1)
+
+    # plain lists are much faster than arrays for scalar access in Python
+    parent = list(range(n_labels + 1))
+    size = [1] * (n_labels + 1)
+    for u, v in pairs.tolist():
+        uf_union(parent, size, u, v)
+
+    parent = np.array(parent, dtype=np.int64)
+    return flatten(parent)
+
+
 def get_representative_labels(unique_labels, to_be_merged):
     """Compute representative labels for each cluster using union-find.
 
@@ -52,11 +167,10 @@ def get_representative_labels(unique_labels, to_be_merged):
     dict
         Mapping from each label to its representative label.
     """
-    uf = nx.utils.UnionFind(unique_labels)
-    for u, v in to_be_merged:
-        uf.union(u, v)
-
-    return {l: uf[l] for l in unique_labels}
+    unique_labels = [int(l) for l in unique_labels]
+    n_labels = max(unique_labels, default=0)
+    representatives = get_representative_array(n_labels, to_be_merged)
+    return {l: int(representatives[l]) for l in unique_labels}
 
 if __name__ == "__main__":
     print("=== Cluster Merging Demo (Union-Find) ===\n")
@@ -0,0 +1,128 @@
+"""Bit-packed occupancy lattices.
+
+A boolean occupancy array costs one byte per site. `PackedOccupancy`
+stores 8 sites per byte instead, in the layout of ``np.packbits(occ,
+axis=1)``: the first site of each row is the most significant bit of the
+row's first byte, and the unused bits at the end of a row are zero.
+
+The labeling engines consume packed lattices row by row: indexing a
+`PackedOccupancy` unpacks only the requested rows, and `find_runs_packed`
+finds the runs of occupied sites of a row directly from its bytes.
+"""
+
+import numpy as np
+
+
+def find_runs_packed(bits, width):
+    """Find the runs of occupied sites in a single bit-packed row.
+
+    A run starts or ends wherever a site differs from the site before it.
+    These changes are found with bit operations on whole bytes, and only
+    the bytes containing a change are unpacked.
+
+    Parameters
+    ----------
+    bits : numpy.ndarray
+        1D uint8 array holding the packed row (unused bits must be zero).
+    width : int
+        Number of sites in the row.
+
+    Returns
+    -------
+    starts : numpy.ndarray
+        Index of the first site of each run.
+    ends : numpy.ndarray
+        Index one past the last site of each run.
+    """
+    # an empty byte at the end closes a run reaching the last site
+    padded = np.zeros(len(bits) + 1, dtype=np.uint8)
+    padded[:-1] = bits
+    previous = padded >> 1
+    previous[1:] |= padded[:-1] << 7
+    changes = padded ^ previous
+
+    changed_bytes = np.flatnonzero(changes)
+    changed_bits = np.flatnonzero(np.unpackbits(changes[changed_bytes]))
+    edges = changed_bytes[changed_bits // 8] * 8 + changed_bits % 8
+    return edges[0::2], edges[1::2]
+
+
+class PackedOccupancy:
+    """A 2D occupancy lattice stored with 8 sites per byte.
+
+    Parameters
+    ----------
+    bits : array_like
+        2D uint8 array of shape (rows, ceil(cols / 8)) in the layout of
+        ``np.packbits(occ, axis=1)``. It may be a memory-mapped array.
+    width : int
+        Number of columns of the lattice.
+
+    Attributes
+    ----------
+    bits : numpy.ndarray
+        The packed bytes.
+    shape : tuple of int
+        Shape (rows, cols) of the unpacked lattice.
+
+    Raises
+    ------
+    ValueError
+        If `bits` does not have the shape of a packed lattice of `width`
+        columns.
+    """
+
+    def __init__(self, bits, width):
+        bits = np.asarray(bits, dtype=np.uint8)
+        if bits.ndim != 2 or bits.shape[1] != (width + 7) // 8:
+            raise ValueError(f"bits of shape {bits.shape} do not hold rows of {width} sites")
+        self.bits = bits
+        self.shape = (bits.shape[0], int(width))
+
+    @classmethod
+    def from_array(cls, occ):
+        """Pack a 2D boolean or integer occupancy array."""
+        occ = np.asarray(occ, dtype=bool)
+        if occ.ndim != 2:
+            raise ValueError("occupancy must be a 2D array")
+        return cls(np.packbits(occ, axis=1), occ.shape[1])
+
+    @property
+    def nbytes(self):
+        """Number of bytes used by the packed lattice."""
+        return self.bits.nbytes
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __getitem__(self, rows):
+        """Unpack a row (integer index) or a block of rows (slice) to booleans."""
+        return np.unpackbits(self.bits[rows], axis=-1, count=self.shape[1]).view(bool)
+
+    def __iter__(self):
+        for y in range(len(self)):
+            yield self[y]
+
+    def row_runs(self, y):
+        """Runs of occupied sites of row `y`, see `find_runs_packed`."""
+        return find_runs_packed(self.bits[y], self.shape[1])
+
+    def unpack(self):
+        """Return the whole lattice as a 2D boolean array."""
+        return self[:]
+
+
+if __name__ == "__main__":
+    print("=== Packed Occupancy Demo ===\n")
+
+    rng = np.random.default_rng(1)
+    occ = rng.random((4, 12)) <= 0.5
+    packed = PackedOccupancy.from_array(occ)
+
+    print("Occupancy grid:")
+    print(occ.astype(int))
+    print(f"\n{occ.nbytes} bytes unpacked, {packed.nbytes} bytes packed")
+    for y in range(len(packed)):
+        starts, ends = packed.row_runs(y)
+        print(f"row {y}: runs {list(zip(starts.tolist(), ends.tolist()))}")
+    assert np.array_equal(packed.unpack(), occ)
@@ -6,10 +6,14 @@ merged when clusters connect.
 """
 
 import numpy as np
+from merge import uf_find, flatten
+from packed import PackedOccupancy
+from label_dtype import label_dtype
+from stencils import get_stencil, is_default, joins_runs
 from plot import plot_occupancy, plot_labels
 
 
-def pass1(occ):
+def pass1(occ, dtype=None, connectivity=4):
     """Perform the first pass of Hoshen-Kopelman labeling.
 
     Scans the occupancy grid row by row, left to right. Each occupied site
@@ -18,8 +22,15 @@ def pass1(occ):
 
     Parameters
     ----------
-    occ : array_like
-        2D boolean or integer array where True/non-zero indicates occupied sites.
+    occ : array_like or PackedOccupancy
+        2D boolean or integer array where True/non-zero indicates occupied
+        sites, or a bit-packed lattice, which is unpacked row by row.
+    dtype : numpy.dtype, optional
+        Integer type of the label lattice. By default the smallest type
+        that can hold every label is chosen (see `label_dtype.label_dtype`).
+    connectivity : int, str or array_like, optional
+        Neighbor stencil, see `stencils.get_stencil`. Stencils other than
+        the default 4 are labeled by `pass1_stencil`.
 
     Returns
     -------
@@ -28,17 +39,22 @@ def pass1(occ):
     to_be_merged : list of tuple
         List of (label1, label2) pairs that need to be merged.
     """
-    occ = np.asarray(occ).astype(bool)
+    stencil = get_stencil(connectivity)
+    if not is_default(stencil):
+        return pass1_stencil(occ, dtype, stencil)
+    if not isinstance(occ, PackedOccupancy):
+        occ = np.asarray(occ, dtype=bool)
     h, w = occ.shape
-    labels_lattice = np.zeros((h, w), dtype=np.int64)
+    labels_lattice = np.zeros((h, w), dtype=label_dtype((h, w), dtype))
 
     next_label = 1
     to_be_merged = []
 
     # 1st pass
     for y in range(h):
+        row = occ[y]
         for x in range(w):
-            if not occ[y, x]:
+            if not row[x]:
                 continue
 
             up = labels_lattice[y - 1, x] if y > 0 else 0
@@ -59,6 +75,131 @@ def pass1(occ):
     return labels_lattice, to_be_merged
 
 
+def pass1_stencil(occ, dtype=None, connectivity=4):
+    """Perform the first pass of Hoshen-Kopelman labeling for any stencil.
+
+    Like `pass1`, but the neighbors already visited are given by the
+    backward offsets of a stencil: each occupied site takes the label of
+    its first labeled neighbor, and every neighbor with a different label
+    is recorded for merging.
+
+    Parameters
+    ----------
+    occ : array_like or PackedOccupancy
+        2D boolean or integer array where True/non-zero indicates occupied
+        sites, or a bit-packed lattice, which is unpacked row by row.
+    dtype : numpy.dtype, optional
+        Integer type of the label lattice, see `pass1`.
+    connectivity : int, str or array_like, optional
+        Neighbor stencil, see `stencils.get_stencil`. Default is 4.
+
+    Returns
+    -------
+    labels_lattice : numpy.ndarray
+        2D integer array of provisional cluster labels (0 = unoccupied).
+    to_be_merged : list of tuple
+        List of (label1, label2) pairs that need to be merged.
+    """
+    stencil = get_stencil(connectivity)
+    if not isinstance(occ, PackedOccupancy):
+        occ = np.asarray(occ, dtype=bool)
+    h, w = occ.shape
+    n_labels = None if joins_runs(stencil) else h * w
+    labels_lattice = np.zeros((h, w), dtype=label_dtype((h, w), dtype, n_labels))
+
+    next_label = 1
+    to_be_merged = []
+
+    for y in range(h):
+        row = occ[y]
+        for x in range(w):
+            if not row[x]:
+                continue
+
+            label = 0
+            for dy, dx in stencil:
+                if y + dy < 0 or not 0 <= x + dx < w:
+                    continue
+                neighbor = labels_lattice[y + dy, x + dx]
+                if neighbor == 0:
+                    continue
+                if label == 0:
+                    label = neighbor
+                elif neighbor != label:
+                    to_be_merged.append((label, neighbor))
+
+            if label == 0:
+                label = next_label
+                next_label += 1
+            labels_lattice[y, x] = label
+
+    return labels_lattice, to_be_merged
+
+
+def pass1_proper_labels(occ, dtype=None):
+    """Perform the first pass keeping the Hoshen-Kopelman label of labels.
+
+    This is the single-pass variant of the original Hoshen-Kopelman
+    algorithm: instead of recording every (up, left) conflict, label
+    equivalences are resolved while scanning in the "label of labels"
+    array, in which each provisional label points to the label it was
+    merged into. Each site receives the proper (root) label of its
+    neighbors at the time it is visited.
+
+    Parameters
+    ----------
+    occ : array_like or PackedOccupancy
+        2D boolean or integer array where True/non-zero indicates occupied
+        sites, or a bit-packed lattice, which is unpacked row by row.
+    dtype : numpy.dtype, optional
+        Integer type of the label lattice. By default the smallest type
+        that can hold every label is chosen (see `label_dtype.label_dtype`).
+
+    Returns
+    -------
+    labels_lattice : numpy.ndarray
+        2D integer array of provisional cluster labels (0 = unoccupied).
+    label_of_labels : numpy.ndarray
+        1D integer array mapping every provisional label to its proper
+        label (entry 0 maps to 0). It can be passed to `pass2` in place
+        of the list of merge pairs.
+    """
+    if not isinstance(occ, PackedOccupancy):
+        occ = np.asarray(occ, dtype=bool)
+    h, w = occ.shape
+    labels_lattice = np.zeros((h, w), dtype=label_dtype((h, w), dtype))
+
+    # no more than every other site can start a new cluster
+    label_of_labels = np.arange((h * w + 1) // 2 + 1, dtype=np.int64)
+    next_label = 1
+
+    for y in range(h):
+        row = occ[y]
+        for x in range(w):
+            if not row[x]:
+                continue
+
+            up = labels_lattice[y - 1, x] if y > 0 else 0
+            left = labels_lattice[y, x - 1] if x > 0 else 0
+
+            if up == 0 and left == 0:
+                labels_lattice[y, x] = next_label
+                next_label += 1
+            elif up != 0 and left == 0:
+                labels_lattice[y, x] = uf_find(label_of_labels, up)
+            elif up == 0 and left != 0:
+                labels_lattice[y, x] = uf_find(label_of_labels, left)
+            else:
+                up = uf_find(label_of_labels, up)
+                left = uf_find(label_of_labels, left)
+                # the larger proper label is merged into the smaller one
+                proper = min(up, left)
+                label_of_labels[max(up, left)] = proper
+                labels_lattice[y, x] = proper
+
+    return labels_lattice, flatten(label_of_labels[:next_label])
+
+
 
 if __name__ == "__main__":
     print("=== Pass 1: Provisional Labeling Demo ===\n")
@@ -88,3 +229,8 @@ if __name__ == "__main__":
     else:
         print("No merges needed.")
 
+    labels_lattice, label_of_labels = pass1_proper_labels(occ)
+    print("\nProvisional labels (label of labels variant):")
+    print(labels_lattice)
+    print(f"Label of labels: {label_of_labels}")
+
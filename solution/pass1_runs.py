@@ -0,0 +1,272 @@
+"""Row-vectorized first pass of the Hoshen-Kopelman algorithm.
+
+This module implements the same first pass as `pass1`, but instead of
+visiting every site in a Python loop it processes one row at a time with
+NumPy: the runs (horizontal segments) of occupied sites in a row each
+receive a provisional label, and runs which overlap a run in the row
+above are recorded for merging. The output contract is the same as that
+of `pass1.pass1`, so the result can be handed to `pass2` unchanged.
+Bit-packed lattices (`packed.PackedOccupancy`) are labeled from the runs
+found in their packed rows, without unpacking them.
+
+Other connectivities (see `stencils`) only add merge pairs: for every
+backward neighbor offset (dy, dx), the labels of a row are paired with
+the labels of row y + dy shifted by dx. If horizontally adjacent sites
+are not neighbors, every occupied site is a run of its own.
+"""
+
+import numpy as np
+from packed import PackedOccupancy
+from label_dtype import label_dtype
+from stencils import get_stencil, joins_runs
+from plot import plot_occupancy, plot_labels
+
+
+def find_runs(row):
+    """Find the runs of occupied sites in a single row.
+
+    Parameters
+    ----------
+    row : numpy.ndarray
+        1D boolean array.
+
+    Returns
+    -------
+    starts : numpy.ndarray
+        Index of the first site of each run.
+    ends : numpy.ndarray
+        Index one past the last site of each run.
+    """
+    padded = np.concatenate(([False], row, [False]))
+    edges = np.flatnonzero(padded[1:] != padded[:-1])
+    return edges[0::2], edges[1::2]
+
+
+def label_runs(row, first_label, out):
+    """Give each run of occupied sites in a row its own label.
+
+    Parameters
+    ----------
+    row : numpy.ndarray
+        1D boolean array.
+    first_label : int
+        Label of the leftmost run; the following runs are numbered
+        consecutively.
+    out : numpy.ndarray
+        1D integer array the labels are written to (0 = unoccupied).
+
+    Returns
+    -------
+    int
+        Number of runs in the row.
+    """
+    starts = row.copy()
+    starts[1:] &= ~row[:-1]
+    run_index = np.cumsum(starts)
+    out[:] = np.where(row, run_index + (first_label - 1), 0)
+    return int(run_index[-1]) if len(run_index) else 0
+
+
+def label_run_bounds(starts, ends, first_label, out):
+    """Give each run of occupied sites, given by its bounds, its own label.
+
+    Parameters
+    ----------
+    starts, ends : numpy.ndarray
+        Bounds of the runs in a row, as returned by `find_runs`.
+    first_label : int
+        Label of the leftmost run; the following runs are numbered
+        consecutively.
+    out : numpy.ndarray
+        1D integer array the labels are written to (0 = unoccupied).
+
+    Returns
+    -------
+    int
+        Number of runs in the row.
+    """
+    run_labels = np.arange(first_label, first_label + len(starts), dtype=out.dtype)
+    steps = np.zeros(len(out) + 1, dtype=out.dtype)
+    steps[starts] = run_labels
+    steps[ends] -= run_labels
+    np.cumsum(steps[:-1], out=out)
+    return len(starts)
+
+
+def shifted_merge_pairs(labels, labels_other, dx):
+    """Find the label pairs of touching sites in a row and a shifted row.
+
+    The site x of `labels` is paired with the site x + dx of
+    `labels_other`. Consecutive duplicates (a run overlapping another run
+    over several sites) are dropped, so each pair of touching runs is
+    recorded once.
+
+    Parameters
+    ----------
+    labels : numpy.ndarray
+        1D integer array of labels of the current row.
+    labels_other : numpy.ndarray
+        1D integer array of labels of the neighboring row.
+    dx : int
+        Column offset of the neighbors in `labels_other`.
+
+    Returns
+    -------
+    numpy.ndarray
+        (N, 2) integer array of (label, label_other) pairs.
+    """
+    n = max(len(labels) - abs(dx), 0)
+    labels = labels[max(-dx, 0):max(-dx, 0) + n]
+    labels_other = labels_other[max(dx, 0):max(dx, 0) + n]
+    touching = (labels != 0) & (labels_other != 0)
+    pairs = np.stack((labels[touching], labels_other[touching]), axis=1)
+    if len(pairs) > 1:
+        new = np.any(pairs[1:] != pairs[:-1], axis=1)
+        pairs = pairs[np.concatenate(([True], new))]
+    return pairs
+
+
+def row_merge_pairs(labels, labels_above):
+    """Find the label pairs of vertically touching sites in two rows.
+
+    Parameters
+    ----------
+    labels : numpy.ndarray
+        1D integer array of labels of the current row.
+    labels_above : numpy.ndarray
+        1D integer array of labels of the row above.
+
+    Returns
+    -------
+    numpy.ndarray
+        (N, 2) integer array of (label, label_above) pairs, see
+        `shifted_merge_pairs`.
+    """
+    return shifted_merge_pairs(labels, labels_above, 0)
+
+
+def merge_offsets(stencil):
+    """Backward offsets of a stencil which give rise to merge pairs.
+
+    The offset (0, -1) is left out if it joins the sites of a run.
+    """
+    return tuple(offset for offset in stencil if offset != (0, -1) or not joins_runs(stencil))
+
+
+def row_runs(occ, y, stencil):
+    """Bounds of the runs of row `y` for the given stencil.
+
+    Parameters
+    ----------
+    occ : numpy.ndarray or PackedOccupancy
+        2D boolean occupancy.
+    y : int
+        Row index.
+    stencil : tuple of tuple
+        Backward offsets, see `stencils.get_stencil`.
+
+    Returns
+    -------
+    starts, ends : numpy.ndarray
+        Bounds of the runs as returned by `find_runs`; single sites if
+        horizontally adjacent sites are not neighbors in `stencil`.
+    """
+    if not joins_runs(stencil):
+        starts = np.flatnonzero(occ[y])
+        return starts, starts + 1
+    if isinstance(occ, PackedOccupancy):
+        return occ.row_runs(y)
+    return find_runs(occ[y])
+
+
+def stencil_merge_pairs(labels_lattice, y, offsets):
+    """Merge pairs of row `y` with the rows before it.
+
+    Parameters
+    ----------
+    labels_lattice : numpy.ndarray
+        2D integer array of provisional labels of rows 0..y.
+    y : int
+        Row index.
+    offsets : tuple of tuple
+        Backward offsets (dy, dx), see `merge_offsets`.
+
+    Returns
+    -------
+    list of numpy.ndarray
+        (N, 2) integer arrays of label pairs, one per offset in range.
+    """
+    return [
+        shifted_merge_pairs(labels_lattice[y], labels_lattice[y + dy], dx)
+        for dy, dx in offsets if y + dy >= 0
+    ]
+
+
+def pass1_runs(occ, dtype=None, connectivity=4):
+    """Perform the first pass of Hoshen-Kopelman labeling row by row.
+
+    Every run of occupied sites receives a fresh provisional label, and
+    every pair of runs which touch across neighboring rows is recorded
+    for merging.
+
+    Parameters
+    ----------
+    occ : array_like or PackedOccupancy
+        2D boolean or integer array where True/non-zero indicates occupied
+        sites, or a bit-packed lattice.
+    dtype : numpy.dtype, optional
+        Integer type of the label lattice. By default the smallest type
+        that can hold every label is chosen (see `label_dtype.label_dtype`).
+    connectivity : int, str or array_like, optional
+        Neighbor stencil, see `stencils.get_stencil`. Default is 4.
+
+    Returns
+    -------
+    labels_lattice : numpy.ndarray
+        2D integer array of provisional cluster labels (0 = unoccupied).
+    to_be_merged : numpy.ndarray
+        (N, 2) integer array of label pairs that need to be merged.
+    """
+    stencil = get_stencil(connectivity)
+    offsets = merge_offsets(stencil)
+    packed = isinstance(occ, PackedOccupancy)
+    if not packed:
+        occ = np.asarray(occ, dtype=bool)
+    h, w = occ.shape
+    n_labels = None if joins_runs(stencil) else h * w
+    labels_lattice = np.zeros((h, w), dtype=label_dtype((h, w), dtype, n_labels))
+
+    next_label = 1
+    to_be_merged = [np.empty((0, 2), dtype=np.int64)]
+
+    for y in range(h):
+        if packed or not joins_runs(stencil):
+            starts, ends = row_runs(occ, y, stencil)
+            next_label += label_run_bounds(starts, ends, next_label, labels_lattice[y])
+        else:
+            next_label += label_runs(occ[y], next_label, labels_lattice[y])
+        to_be_merged.extend(stencil_merge_pairs(labels_lattice, y, offsets))
+
+    return labels_lattice, np.concatenate(to_be_merged)
+
+
+if __name__ == "__main__":
+    print("=== Pass 1 (row-vectorized): Provisional Labeling Demo ===\n")
+    occ = np.array((
+        (1, 1, 0, 0, 1),
+        (0, 1, 0, 0, 0),
+        (1, 1, 0, 0, 1),
+        (0, 0, 0, 1, 1)))
+
+    print("Occupancy grid:")
+    print(occ)
+    plot_occupancy(occ)
+
+    labels_lattice, to_be_merged = pass1_runs(occ)
+    plot_labels(labels_lattice, title="provisional labels (runs)")
+
+    print("\nProvisional labels (one label per run):")
+    print(labels_lattice)
+    print("Merge operations needed:")
+    for a, b in to_be_merged:
+        print(f"  {a} <-> {b}")
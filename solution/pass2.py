@@ -5,8 +5,7 @@ and replaces provisional labels with their final representative labels.
 """
 
 import numpy as np
-import networkx as nx
-from merge import get_representative_labels
+from merge import get_representative_array
 from replace_labels import replace_labels
 from pass1 import pass1
 from plot import plot_occupancy, plot_labels
@@ -21,8 +20,11 @@ def pass2(labels_lattice, to_be_merged):
     ----------
     labels_lattice : numpy.ndarray
         2D integer array of provisional cluster labels from pass1.
-    to_be_merged : list of tuple
-        List of (label1, label2) pairs that need to be merged.
+    to_be_merged : list of tuple or numpy.ndarray
+        List of (label1, label2) pairs, or an (N, 2) integer array,
+        of labels that need to be merged. A 1D integer array is taken
+        as an already resolved label of labels (as returned by
+        `pass1.pass1_proper_labels`) and applied directly.
 
     Returns
     -------
@@ -31,12 +33,19 @@ def pass2(labels_lattice, to_be_merged):
     unique_labels : set
         Set of unique final cluster labels (excluding 0).
     """
-    unique_labels = set(np.unique(labels_lattice))
-    unique_labels.discard(0)
-    representative_labels = get_representative_labels(unique_labels, to_be_merged)
+    n_labels = int(labels_lattice.max(initial=0))
+    if isinstance(to_be_merged, np.ndarray) and to_be_merged.ndim == 1:
+        representative_labels = to_be_merged
+    else:
+        representative_labels = get_representative_array(n_labels, to_be_merged)
+
+    present = np.zeros(n_labels + 1, dtype=bool)
+    present[labels_lattice] = True
+    present[0] = False
+    unique_labels = set(np.unique(representative_labels[present]).tolist())
 
     labels_lattice = replace_labels(labels_lattice, representative_labels)
-    return labels_lattice, set(representative_labels.values()) 
+    return labels_lattice, unique_labels
 
 
 
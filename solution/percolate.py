@@ -1,10 +1,17 @@
 """Percolation detection for labeled lattices.
 
 This module provides functions to check whether a cluster spans
-(percolates) across a 2D lattice in different directions.
+(percolates) across a 2D lattice in different directions, either from a
+labeled lattice or directly from the occupancy with `spans`.
 """
 
 import numpy as np
+from merge import uf_find, uf_union
+from pass1_runs import label_runs, label_run_bounds, row_merge_pairs
+from hk_numba import spans_numba, NUMBA_AVAILABLE
+from packed import PackedOccupancy
+from stencils import get_stencil, is_default
+from backends import get_backend
 
 
 def percolates_lr(labels_lattice):
@@ -69,6 +76,106 @@ def percolates(labels_lattice):
     return percolates_tb(labels_lattice) or percolates_lr(labels_lattice)
 
 
+def spans(occ, direction="lr", connectivity=4):
+    """Check whether a spanning cluster exists, without labeling the lattice.
+
+    Runs of occupied sites are joined in a union-find structure row by
+    row, together with two virtual nodes standing for the left and right
+    edge. The scan stops as soon as both virtual nodes are connected, and
+    no label lattice is ever written. For "tb", the columns of the lattice
+    are scanned instead of the rows. If numba is installed, the compiled
+    `hk_numba.spans_numba` is used.
+
+    For other stencils than the default 4-connectivity, the lattice is
+    labeled by the fastest backend that supports the stencil and the
+    edge columns (or rows) of the labels are compared.
+
+    Parameters
+    ----------
+    occ : array_like or PackedOccupancy
+        2D boolean or integer array where True/non-zero indicates occupied
+        sites, or a bit-packed lattice. Packed lattices are read row by row
+        for "lr" without numba, and unpacked otherwise.
+    direction : str, optional
+        "lr" (left-right) or "tb" (top-bottom). Default is "lr".
+    connectivity : int, str or array_like, optional
+        Neighbor stencil, see `stencils.get_stencil`. Default is 4.
+
+    Returns
+    -------
+    bool
+        True if at least one cluster spans in the given direction.
+
+    Raises
+    ------
+    ValueError
+        If direction is not "lr" or "tb".
+    """
+    stencil = get_stencil(connectivity)
+    if not is_default(stencil):
+        return _spans_labeled(occ, direction, stencil)
+
+    packed = isinstance(occ, PackedOccupancy) and direction == "lr" and not NUMBA_AVAILABLE
+    if isinstance(occ, PackedOccupancy) and not packed:
+        occ = occ.unpack()
+    if NUMBA_AVAILABLE:
+        return spans_numba(occ, direction)
+
+    if not packed:
+        occ = np.asarray(occ, dtype=bool)
+    if direction == "tb":
+        occ = occ.T
+    elif direction != "lr":
+        raise ValueError("direction must be 'lr' or 'tb'")
+    h, w = occ.shape
+    if h == 0 or w == 0:
+        return False
+
+    # labels 1 and 2 are the virtual left and right edge nodes
+    left_edge, right_edge = 1, 2
+    parent = [0, 1, 2]
+    size = [1, 1, 1]
+    next_label = 3
+    labels = np.zeros(w, dtype=np.int64)
+    labels_above = np.zeros(w, dtype=np.int64)
+
+    for y in range(h):
+        if packed:
+            starts, ends = occ.row_runs(y)
+            n_runs = label_run_bounds(starts, ends, next_label, labels)
+        else:
+            n_runs = label_runs(occ[y], next_label, labels)
+        parent.extend(range(next_label, next_label + n_runs))
+        size.extend([1] * n_runs)
+        next_label += n_runs
+
+        if labels[0]:
+            uf_union(parent, size, left_edge, int(labels[0]))
+        if labels[-1]:
+            uf_union(parent, size, right_edge, int(labels[-1]))
+        for a, b in row_merge_pairs(labels, labels_above).tolist():
+            uf_union(parent, size, a, b)
+
+        if uf_find(parent, left_edge) == uf_find(parent, right_edge):
+            return True
+        labels, labels_above = labels_above, labels
+
+    return False
+
+
+def _spans_labeled(occ, direction, stencil):
+    """`spans` for any stencil, by labeling the whole lattice."""
+    if direction not in ("lr", "tb"):
+        raise ValueError("direction must be 'lr' or 'tb'")
+    if isinstance(occ, PackedOccupancy):
+        occ = occ.unpack()
+    occ = np.asarray(occ, dtype=bool)
+    if occ.size == 0:
+        return False
+    labels_lattice, _ = get_backend("auto", occ.shape)["label"](occ, None, stencil)
+    return percolates_lr(labels_lattice) if direction == "lr" else percolates_tb(labels_lattice)
+
+
 if __name__ == "__main__":
     print("=== Percolation Detection Demo ===\n")
 
@@ -102,7 +209,12 @@ if __name__ == "__main__":
     print(f"  percolates_tb: {percolates_tb(not_perc)}")
     print(f"  percolates:    {percolates(not_perc)}")
 
+    print("\nDirectly from the occupancy:")
+    print(f"  spans lr: {spans(perc != 0, 'lr')}, spans tb: {spans(perc != 0, 'tb')}")
+
     # Verify correctness
+    assert spans(perc != 0, "lr") and spans(perc.T != 0, "tb")
+    assert not spans(not_perc != 0, "lr") and not spans(not_perc.T != 0, "tb")
     assert percolates(perc)
     assert percolates(perc.T)
     assert not percolates(not_perc)
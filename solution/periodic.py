@@ -0,0 +1,182 @@
+"""Cluster labeling with periodic boundary conditions.
+
+On a torus the first and last column, and the first and last row, are
+neighbors. The lattice is first labeled with open boundaries by one of
+the registered backends; then the pairs of touching sites across the two
+wrap-around seams are merged in a union-find, like the seams between
+tiles in `tiled`.
+
+A cluster touching both edges of a periodic lattice does not necessarily
+wrap around it. To tell winding clusters apart, every label in the
+union-find also stores its displacement (in lattice periods) relative to
+its root: the open clusters are copies placed in the plane, and crossing
+a seam shifts the neighbor by one period. A seam pair joining two labels
+which already share a root, but at a displacement different from the
+one the pair requires, closes a loop around the torus; the difference is
+a winding vector of the cluster.
+"""
+
+import numpy as np
+from backends import get_backend
+from renumber_labels import renumber_labels
+from replace_labels import replace_labels
+from streaming import final_labels
+
+# winding flags of a cluster: it wraps around the lattice horizontally
+# (left-right) and/or vertically (top-bottom)
+WRAPS_LR, WRAPS_TB = 1, 2
+
+
+def _find(parent, offset, a):
+    """Root of `a` and the displacement (dy, dx) of `a` relative to it.
+
+    `parent` and `offset` are dictionaries; labels missing from `parent`
+    are roots. The path to the root is compressed.
+    """
+    path = []
+    while parent.get(a, a) != a:
+        path.append(a)
+        a = parent[a]
+    dy = dx = 0
+    for node in reversed(path):
+        oy, ox = offset[node]
+        dy, dx = dy + oy, dx + ox
+        parent[node], offset[node] = a, (dy, dx)
+    return a, (dy, dx)
+
+
+def seam_pairs(labels_lattice):
+    """Collect the label pairs of touching sites across the wrap-around seams.
+
+    Parameters
+    ----------
+    labels_lattice : numpy.ndarray
+        2D integer array of open-boundary cluster labels (0 = unoccupied).
+
+    Returns
+    -------
+    list of tuple
+        (a, b, dy, dx) tuples: the site labeled b touches the site labeled
+        a if it is moved by (dy, dx) lattice periods.
+    """
+    pairs = []
+    for a, b, shift in (
+        (labels_lattice[:, -1], labels_lattice[:, 0], (0, 1)),
+        (labels_lattice[-1, :], labels_lattice[0, :], (1, 0)),
+    ):
+        touching = (a != 0) & (b != 0)
+        seam = np.stack((a[touching], b[touching]), axis=1)
+        if len(seam) > 1:
+            seam = seam[np.concatenate(([True], np.any(seam[1:] != seam[:-1], axis=1)))]
+        pairs.extend((int(x), int(y)) + shift for x, y in seam.tolist())
+    return pairs
+
+
+def hoshen_kopelman_periodic(occ, backend="auto", dtype=None):
+    """Label connected clusters on a lattice with periodic boundaries.
+
+    Parameters
+    ----------
+    occ : array_like
+        2D boolean or integer array where True/non-zero indicates occupied sites.
+    backend : str, optional
+        Backend used for the open-boundary labeling (see
+        `backends.list_backends`). Default is "auto".
+    dtype : numpy.dtype, optional
+        Integer type of the label lattice, see `hk.hoshen_kopelman`.
+
+    Returns
+    -------
+    labels_lattice : numpy.ndarray
+        2D integer array with cluster labels 1..n (0 = unoccupied).
+    winding : numpy.ndarray
+        1D int64 array of length n + 1; entry l combines the flags
+        `WRAPS_LR` and `WRAPS_TB` of the directions in which cluster l
+        winds around the torus (0 if it does not wrap).
+    """
+    occ = np.asarray(occ)
+    backend = get_backend(backend, occ.shape)
+    labels_lattice, unique_labels = backend["label"](occ, dtype)
+    if "contiguous_labels" not in backend["capabilities"]:
+        labels_lattice = renumber_labels(labels_lattice, sorted(unique_labels), inplace=True)
+    n_labels = len(unique_labels)
+
+    parent, offset, flags = {}, {}, {}
+    if labels_lattice.size:
+        for a, b, dy, dx in seam_pairs(labels_lattice):
+            root_a, (ay, ax) = _find(parent, offset, a)
+            root_b, (by, bx) = _find(parent, offset, b)
+            # the root of b must sit at this displacement from the root of a
+            vy, vx = ay + dy - by, ax + dx - bx
+            if root_a != root_b:
+                parent[root_b], offset[root_b] = root_a, (vy, vx)
+                flags[root_a] = flags.get(root_a, 0) | flags.pop(root_b, 0)
+            elif vy or vx:
+                flags[root_a] = flags.get(root_a, 0) | (WRAPS_LR if vx else 0) | (WRAPS_TB if vy else 0)
+
+    representative_labels = np.arange(n_labels + 1, dtype=np.int64)
+    for label in list(parent):
+        representative_labels[label] = _find(parent, offset, label)[0]
+    lookup, n_clusters = final_labels(representative_labels)
+    replace_labels(labels_lattice, lookup, inplace=True)
+
+    winding = np.zeros(n_clusters + 1, dtype=np.int64)
+    for root, root_flags in flags.items():
+        winding[lookup[root]] |= root_flags
+    return labels_lattice, winding
+
+
+def wraps(winding, direction="lr"):
+    """Check whether any cluster winds around the torus.
+
+    Parameters
+    ----------
+    winding : numpy.ndarray
+        Winding flags of the clusters, as returned by
+        `hoshen_kopelman_periodic`.
+    direction : str, optional
+        "lr" (horizontally), "tb" (vertically), "both" (one cluster winds
+        in both directions) or "either". Default is "lr".
+
+    Returns
+    -------
+    bool
+        True if a cluster winds in the given direction.
+
+    Raises
+    ------
+    ValueError
+        If direction is unknown.
+    """
+    if direction == "lr":
+        return bool(np.any(winding & WRAPS_LR))
+    if direction == "tb":
+        return bool(np.any(winding & WRAPS_TB))
+    if direction == "both":
+        return bool(np.any(winding == WRAPS_LR | WRAPS_TB))
+    if direction == "either":
+        return bool(np.any(winding))
+    raise ValueError("direction must be 'lr', 'tb', 'both' or 'either'")
+
+
+if __name__ == "__main__":
+    print("=== Periodic Hoshen-Kopelman Demo ===\n")
+
+    # cluster 1 touches the left and right edge, which are joined through
+    # the seam, but does not wind around the torus; cluster 2 does
+    occ = np.array((
+        (1, 0, 0, 0, 1),
+        (1, 1, 1, 0, 0),
+        (0, 0, 0, 0, 0),
+        (1, 1, 1, 1, 1),
+        (0, 0, 0, 0, 0)))
+    labels_lattice, winding = hoshen_kopelman_periodic(occ)
+    print("Occupancy grid:")
+    print(occ)
+    print("\nPeriodic labels:")
+    print(labels_lattice)
+    for label, flags in enumerate(winding[1:], start=1):
+        directions = [name for name, flag in (("lr", WRAPS_LR), ("tb", WRAPS_TB)) if flags & flag]
+        print(f"cluster {label}: winds {', '.join(directions) or 'nowhere'}")
+    print(f"\nwraps lr: {wraps(winding, 'lr')}, tb: {wraps(winding, 'tb')}, "
+          f"both: {wraps(winding, 'both')}")
@@ -19,15 +19,7 @@ def plot_labels(labels_lattice, ax=None, title=None, fname=None):
     Labels are renumbered to be contiguous before plotting.
     The original array is not modified.
     """
-    labels_lattice = np.asarray(labels_lattice).copy()
-
-    # renumber labels to be contiguous (1, 2, 3, ..., n)
-    unique_labels = tuple(sorted(set(np.unique(labels_lattice)) - {0}))
-    if unique_labels:
-        labels_lattice = renumber_labels(labels_lattice, unique_labels)
-
-
-
+    labels_lattice = np.asarray(labels_lattice)
 
     if labels_lattice.ndim != 2:
         raise ValueError("labels_lattice must be a 2D array")
@@ -36,6 +28,12 @@ def plot_labels(labels_lattice, ax=None, title=None, fname=None):
     if not np.issubdtype(labels_lattice.dtype, np.integer):
         raise TypeError("labels_lattice must have integer dtype")
 
+    # renumber labels to be contiguous (1, 2, 3, ..., n); this returns a copy
+    unique_labels = np.unique(labels_lattice)
+    unique_labels = unique_labels[unique_labels != 0]
+    if len(unique_labels):
+        labels_lattice = renumber_labels(labels_lattice, unique_labels)
+
     n = int(labels_lattice.max())  # assumes max label equals n
 
     # Pick base colormap
@@ -8,26 +8,7 @@ import numpy as np
 from replace_labels import replace_labels
 
 
-def _get_replacements(unique_labels):
-    """Create a mapping from original labels to contiguous integers.
-
-    Parameters
-    ----------
-    unique_labels : iterable
-        Collection of unique labels (e.g., [1, 2, 4, 6]).
-
-    Returns
-    -------
-    dict
-        Mapping from original labels to new contiguous labels (1, 2, 3, ...).
-    """
-    n = len(unique_labels)
-    new_labels = list(range(1, n + 1))
-    replacements = {orig: new for orig, new in zip(unique_labels, new_labels)}
-    return replacements
-
-
-def renumber_labels(labels_lattice, unique_labels):
+def renumber_labels(labels_lattice, unique_labels, inplace=False):
     """Renumber cluster labels to be contiguous integers.
 
     Replaces labels in the lattice so they form a contiguous sequence
@@ -39,14 +20,19 @@ def renumber_labels(labels_lattice, unique_labels):
         2D integer array of cluster labels.
     unique_labels : iterable
         Collection of unique non-zero labels in the lattice.
+    inplace : bool, optional
+        If True, `labels_lattice` is overwritten. Default is False.
 
     Returns
     -------
     numpy.ndarray
-        New 2D integer array with renumbered labels.
+        2D integer array with renumbered labels.
     """
-    replacements = _get_replacements(unique_labels)
-    return replace_labels(labels_lattice, replacements)
+    unique_labels = np.fromiter(unique_labels, dtype=np.int64)
+    max_label = max(int(labels_lattice.max(initial=0)), int(unique_labels.max(initial=0)))
+    replacements = np.zeros(max_label + 1, dtype=np.int64)
+    replacements[unique_labels] = np.arange(1, len(unique_labels) + 1)
+    return replace_labels(labels_lattice, replacements, inplace=inplace)
 
 
 if __name__ == "__main__":
@@ -63,8 +49,6 @@ if __name__ == "__main__":
     print(labels_lattice)
 
     print(f"\nUnique labels: {unique_labels}")
-    replacements = _get_replacements(unique_labels)
-    print(f"Replacement mapping: {replacements}")
 
     print("\nRenumbered labels (contiguous: 1, 2, 3):")
     print(renumber_labels(labels_lattice, unique_labels))
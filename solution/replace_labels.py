@@ -7,35 +7,92 @@ according to a given mapping.
 import numpy as np
 
 
-def replace_labels(old_labels, replace_by):
+def make_lookup(replace_by, max_label=None):
+    """Build a dense lookup array from a label mapping.
+
+    Parameters
+    ----------
+    replace_by : dict or array_like
+        Mapping from old labels to new labels. A 1D integer array is
+        taken to be a lookup table already (entry ``l`` is the new label
+        of ``l``) and is returned unchanged.
+    max_label : int, optional
+        Largest label the lookup array must cover. The array always covers
+        the largest key of `replace_by` as well, so the mapping may contain
+        labels that do not occur in the lattice.
+
+    Returns
+    -------
+    numpy.ndarray
+        1D integer array `lookup` with ``lookup[old] == new``. Labels
+        missing from the mapping keep their value; ``lookup[0] == 0``.
+    """
+    if not isinstance(replace_by, dict):
+        return np.asarray(replace_by)
+
+    old = np.fromiter(replace_by.keys(), dtype=np.int64, count=len(replace_by))
+    new = np.fromiter(replace_by.values(), dtype=np.int64, count=len(replace_by))
+    max_label = max(int(old.max(initial=0)), max_label or 0)
+    lookup = np.arange(max_label + 1, dtype=np.int64)
+    lookup[old] = new
+    lookup[0] = 0
+    return lookup
+
+
+def replace_labels(old_labels, replace_by, inplace=False):
     """Replace cluster labels according to a mapping.
 
     Creates a new label array where each non-zero label is replaced
-    according to the provided mapping dictionary.
+    according to the provided mapping. The mapping is turned into a
+    dense lookup array once and applied to the whole lattice with a
+    single `numpy.take`.
 
     Parameters
     ----------
     old_labels : numpy.ndarray
         2D integer array of original cluster labels.
-    replace_by : dict
-        Mapping from old labels to new labels. All non-zero labels
-        in old_labels must be present as keys.
+    replace_by : dict or numpy.ndarray
+        Mapping from old labels to new labels, either as a dictionary
+        or as a 1D lookup array indexed by the old label. Labels missing
+        from a dictionary keep their value; a lookup array must cover
+        every label in old_labels.
+    inplace : bool, optional
+        If True, `old_labels` is overwritten with the new labels and
+        returned. Default is False.
 
     Returns
     -------
     numpy.ndarray
-        New 2D integer array with replaced labels. Sites with label 0
-        remain unchanged.
+        2D integer array with replaced labels, of the same type as
+        `old_labels`. Sites with label 0 remain unchanged.
+
+    Raises
+    ------
+    KeyError
+        If a lookup array is shorter than the largest label in old_labels.
+    ValueError
+        If a new label does not fit the integer type of old_labels.
     """
-    new_labels = np.zeros_like(old_labels)
-    rows, cols = new_labels.shape
-    for y in range(rows):
-        for x in range(cols):
-            if old_labels[y, x] != 0:
-                old = old_labels[y, x]
-                new_labels[y, x] = replace_by[old]
-    return new_labels
+    old_labels = np.asarray(old_labels)
+    max_label = int(old_labels.max(initial=0))
+    lookup = make_lookup(replace_by, max_label)
+    if len(lookup) <= max_label:
+        raise KeyError(f"label {max_label} is not covered by the mapping")
+
+    # only the entries of labels that can occur are applied (and checked)
+    lookup = lookup[:max_label + 1]
+    info = np.iinfo(old_labels.dtype)
+    if lookup.min() < info.min or lookup.max() > info.max:
+        raise ValueError(f"new labels do not fit the label type {old_labels.dtype}")
 
+    # only the (short) lookup array is converted to the label type, so the
+    # result is produced in the type of old_labels without a further copy
+    lookup = lookup.astype(old_labels.dtype, copy=False)
+    if not inplace:
+        return lookup[old_labels]
+    # every label is in range (checked above), so no bounds checks are needed
+    np.take(lookup, old_labels, out=old_labels, mode="clip")
+    return old_labels
 
 if __name__ == "__main__":
     print("=== Label Replacement Demo ===\n")
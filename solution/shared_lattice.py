@@ -0,0 +1,160 @@
+"""Lattice buffers shared between processes without copying.
+
+Passing multi-GB occupancy and label arrays to worker processes through a
+process pool pickles a copy for every task. A `SharedLattice` instead
+places the array in a `multiprocessing.shared_memory` segment (or in a
+memory-mapped ``.npy`` file); only its small, picklable `spec` is sent to
+the workers, which `attach` to the same buffer by name and read or write
+it in place.
+
+The process creating a `SharedLattice` owns the buffer and releases it
+when the lattice is closed, when its ``with`` block is left (also by an
+exception, e.g. after a worker crashed) or when it is garbage collected.
+Workers never release the buffer. Every process' mapping of the buffer
+is closed only once the last array viewing it is gone, so that releasing
+a buffer can never leave a dangling view behind.
+"""
+
+import os
+import sys
+import tempfile
+import weakref
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+
+import numpy as np
+
+
+def _release(shm, path):
+    """Release the buffer of a `SharedLattice` (called exactly once).
+
+    The memory itself is freed by the operating system once the last
+    mapping of it is closed.
+    """
+    if shm is not None:
+        shm.unlink()
+    if path is not None and os.path.exists(path):
+        os.remove(path)
+
+
+def _shm_array(shm, shape, dtype):
+    """Array viewing a shared memory segment, which keeps it mapped."""
+    array = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+    # views of the array keep it alive, so the mapping is closed last
+    weakref.finalize(array, shm.close)
+    return array
+
+
+class SharedLattice:
+    """A NumPy array in shared memory or a memory-mapped file.
+
+    Parameters
+    ----------
+    shape : tuple of int
+        Shape of the array.
+    dtype : numpy.dtype or str
+        Data type of the array.
+    backing : str, optional
+        "shm" (default) for a `multiprocessing.shared_memory` segment, or
+        "memmap" for a memory-mapped ``.npy`` file.
+    path : str, optional
+        File for the "memmap" backing. If given, the file is kept when the
+        lattice is closed; otherwise a temporary file is used and removed.
+
+    Attributes
+    ----------
+    array : numpy.ndarray
+        The shared array (None after `close`).
+    spec : tuple
+        Picklable description passed to `attach` in the workers.
+    """
+
+    def __init__(self, shape, dtype, backing="shm", path=None):
+        shape = tuple(int(n) for n in shape)
+        dtype = np.dtype(dtype)
+        shm, remove = None, None
+
+        if backing == "shm":
+            nbytes = int(np.prod(shape)) * dtype.itemsize
+            shm = shared_memory.SharedMemory(create=True, size=max(nbytes, 1))
+            self.array = _shm_array(shm, shape, dtype)
+            name = shm.name
+        elif backing == "memmap":
+            if path is None:
+                fd, path = tempfile.mkstemp(suffix=".npy")
+                os.close(fd)
+                remove = path
+            self.array = np.lib.format.open_memmap(path, mode="w+", dtype=dtype, shape=shape)
+            name = os.path.abspath(path)
+        else:
+            raise ValueError("backing must be 'shm' or 'memmap'")
+
+        self.spec = (backing, name, shape, dtype.str)
+        self._finalizer = weakref.finalize(self, _release, shm, remove)
+
+    @classmethod
+    def from_array(cls, array, backing="shm", path=None):
+        """Create a shared lattice holding a copy of `array`."""
+        array = np.asarray(array)
+        lattice = cls(array.shape, array.dtype, backing=backing, path=path)
+        lattice.array[...] = array
+        return lattice
+
+    def close(self):
+        """Drop the array and release the buffer."""
+        self.array = None
+        self._finalizer()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+@contextmanager
+def attach(spec, writable=True):
+    """Attach to a `SharedLattice` by its spec, e.g. in a worker process.
+
+    Parameters
+    ----------
+    spec : tuple
+        The `SharedLattice.spec` of the lattice.
+    writable : bool, optional
+        If False, the returned array is read-only. Default is True.
+
+    Yields
+    ------
+    numpy.ndarray
+        View of the shared array. Writes to a memory-mapped file are
+        flushed when the ``with`` block is left.
+    """
+    backing, name, shape, dtype = spec
+    if backing == "shm":
+        if sys.version_info >= (3, 13):
+            shm = shared_memory.SharedMemory(name=name, track=False)
+        else:
+            # pool workers share the owner's resource tracker, so attaching
+            # does not transfer ownership of the segment
+            shm = shared_memory.SharedMemory(name=name)
+        array = _shm_array(shm, shape, dtype)
+        array.flags.writeable = writable
+        yield array
+    else:
+        array = np.load(name, mmap_mode="r+" if writable else "r")
+        try:
+            yield array
+        finally:
+            if writable:
+                array.flush()
+
+
+if __name__ == "__main__":
+    print("=== Shared Lattice Demo ===\n")
+
+    for backing in ("shm", "memmap"):
+        with SharedLattice.from_array(np.eye(3, dtype=bool), backing=backing) as lattice:
+            print(f"{backing}: spec = {lattice.spec}")
+            with attach(lattice.spec) as view:
+                view[0, 2] = True
+            print(lattice.array.astype(int))
@@ -0,0 +1,271 @@
+"""Mergeable accumulator of cluster size distributions.
+
+Estimating the cluster number density n_s near p_c needs the sizes of
+millions of clusters from thousands of lattices. Keeping the label
+lattices (or even the lists of sizes) of all samples is not feasible, so
+`ClusterSizeDistribution` condenses them as they are produced:
+
+- a histogram of cluster sizes in logarithmic bins (a fixed number of
+  bins per factor of two; small sizes have bins of their own),
+- the running mean and variance of the cluster sizes (Welford),
+- the running mean and variance, and the maximum, of the largest
+  cluster per lattice.
+
+Its memory does not depend on the number of lattices. Accumulators of
+different workers are combined with `merge`, and `to_dict`/`from_dict`
+convert them to plain (JSON-compatible) data.
+"""
+
+import numpy as np
+
+
+def _combine_moments(a, b):
+    """Combine two (count, mean, M2) triples of running moments.
+
+    This is the parallel form of Welford's algorithm (Chan et al.); M2 is
+    the sum of squared deviations from the mean.
+    """
+    n_a, mean_a, m2_a = a
+    n_b, mean_b, m2_b = b
+    n = n_a + n_b
+    if n_b == 0:
+        return a
+    if n_a == 0:
+        return b
+    delta = mean_b - mean_a
+    return n, mean_a + delta * n_b / n, m2_a + m2_b + delta ** 2 * n_a * n_b / n
+
+
+def _moments(values, weights=None):
+    """(count, mean, M2) triple of a batch of (weighted) values."""
+    values = np.asarray(values, dtype=np.float64)
+    weights = np.ones_like(values) if weights is None else np.asarray(weights, dtype=np.float64)
+    n = float(weights.sum())
+    if n == 0:
+        return 0, 0.0, 0.0
+    mean = float(np.dot(weights, values) / n)
+    return int(n), mean, float(np.dot(weights, (values - mean) ** 2))
+
+
+def log_bin_edges(bins_per_octave):
+    """Integer edges of logarithmic size bins.
+
+    Parameters
+    ----------
+    bins_per_octave : int
+        Number of bins per factor of two in size.
+
+    Returns
+    -------
+    numpy.ndarray
+        Increasing int64 edges; bin i holds the sizes
+        ``edges[i] <= s < edges[i + 1]``. Bins which would be narrower
+        than one size are merged, so sizes 1, 2, ... get exact bins until
+        the logarithmic bins become wider.
+    """
+    exponents = np.arange(62 * bins_per_octave + 1) / bins_per_octave
+    return np.unique(np.ceil(2.0 ** exponents).astype(np.int64))
+
+
+class ClusterSizeDistribution:
+    """Accumulated cluster size statistics of many lattices.
+
+    Parameters
+    ----------
+    bins_per_octave : int, optional
+        Number of histogram bins per factor of two in size. Default is 4.
+
+    Attributes
+    ----------
+    bin_edges : numpy.ndarray
+        Edges of the size bins, see `log_bin_edges`.
+    counts : numpy.ndarray
+        Number of clusters in each size bin.
+    n_lattices : int
+        Number of lattices added.
+    n_sites : int
+        Total number of sites of the lattices added.
+    largest_max : int
+        Size of the largest cluster seen.
+    """
+
+    def __init__(self, bins_per_octave=4):
+        self.bins_per_octave = int(bins_per_octave)
+        self.bin_edges = log_bin_edges(self.bins_per_octave)
+        self.counts = np.zeros(len(self.bin_edges) - 1, dtype=np.int64)
+        self.n_lattices = 0
+        self.n_sites = 0
+        self.largest_max = 0
+        self._size_moments = (0, 0.0, 0.0)
+        self._largest_moments = (0, 0.0, 0.0)
+
+    def update_counts(self, sizes, counts, n_sites):
+        """Add one lattice given the number of clusters of each size.
+
+        Parameters
+        ----------
+        sizes : array_like
+            Distinct cluster sizes. Sizes of 0 (e.g. of unused labels in
+            a raw `numpy.bincount`) are ignored.
+        counts : array_like
+            Number of clusters of each size.
+        n_sites : int
+            Number of sites of the lattice.
+
+        Raises
+        ------
+        ValueError
+            If a size is negative.
+        """
+        sizes = np.asarray(sizes, dtype=np.int64)
+        counts = np.asarray(counts, dtype=np.int64)
+        if (sizes < 0).any():
+            raise ValueError("cluster sizes must not be negative")
+        sizes, counts = sizes[sizes > 0], counts[sizes > 0]
+        bins = np.searchsorted(self.bin_edges, sizes, side="right") - 1
+        np.add.at(self.counts, bins, counts)
+
+        largest = int(sizes[counts > 0].max(initial=0))
+        self.n_lattices += 1
+        self.n_sites += int(n_sites)
+        self.largest_max = max(self.largest_max, largest)
+        self._size_moments = _combine_moments(self._size_moments, _moments(sizes, counts))
+        self._largest_moments = _combine_moments(self._largest_moments, (1, float(largest), 0.0))
+
+    def update(self, sizes, n_sites):
+        """Add one lattice given the sizes of its clusters.
+
+        Parameters
+        ----------
+        sizes : array_like
+            Size of every cluster of the lattice; sizes of 0 are ignored.
+        n_sites : int
+            Number of sites of the lattice.
+        """
+        self.update_counts(*np.unique(np.asarray(sizes, dtype=np.int64), return_counts=True), n_sites)
+
+    def update_labels(self, labels_lattice):
+        """Add one lattice given its label lattice (0 = unoccupied)."""
+        labels_lattice = np.asarray(labels_lattice)
+        sizes = np.bincount(labels_lattice.ravel())[1:]
+        self.update(sizes[sizes > 0], labels_lattice.size)
+
+    def merge(self, other):
+        """Add the statistics of another accumulator (e.g. of a worker).
+
+        Parameters
+        ----------
+        other : ClusterSizeDistribution
+            Accumulator with the same `bins_per_octave`.
+
+        Returns
+        -------
+        ClusterSizeDistribution
+            This accumulator.
+
+        Raises
+        ------
+        ValueError
+            If the size bins of the two accumulators differ.
+        """
+        if other.bins_per_octave != self.bins_per_octave:
+            raise ValueError("cannot merge size distributions with different bins")
+        self.counts += other.counts
+        self.n_lattices += other.n_lattices
+        self.n_sites += other.n_sites
+        self.largest_max = max(self.largest_max, other.largest_max)
+        self._size_moments = _combine_moments(self._size_moments, other._size_moments)
+        self._largest_moments = _combine_moments(self._largest_moments, other._largest_moments)
+        return self
+
+    @property
+    def n_clusters(self):
+        """Number of clusters added."""
+        return self._size_moments[0]
+
+    @property
+    def mean_size(self):
+        """Mean cluster size."""
+        return self._size_moments[1]
+
+    @property
+    def size_variance(self):
+        """Variance of the cluster sizes."""
+        n, _, m2 = self._size_moments
+        return m2 / n if n else 0.0
+
+    @property
+    def mean_largest(self):
+        """Mean size of the largest cluster per lattice."""
+        return self._largest_moments[1]
+
+    @property
+    def largest_variance(self):
+        """Variance of the size of the largest cluster per lattice."""
+        n, _, m2 = self._largest_moments
+        return m2 / n if n else 0.0
+
+    def density(self):
+        """Estimate the cluster number density n_s per site.
+
+        Returns
+        -------
+        sizes : numpy.ndarray
+            Geometric center of each non-empty size bin.
+        n_s : numpy.ndarray
+            Number of clusters per site and per unit of size in each of
+            these bins.
+        """
+        lo, hi = self.bin_edges[:-1], self.bin_edges[1:]
+        filled = self.counts > 0
+        sizes = np.sqrt(lo * (hi - 1.0))[filled]
+        n_s = self.counts[filled] / (hi - lo)[filled] / max(self.n_sites, 1)
+        return sizes, n_s
+
+    def to_dict(self):
+        """Convert the accumulator to plain, JSON-compatible data."""
+        filled = np.flatnonzero(self.counts)
+        return {
+            "bins_per_octave": self.bins_per_octave,
+            "bins": filled.tolist(),
+            "counts": self.counts[filled].tolist(),
+            "n_lattices": self.n_lattices,
+            "n_sites": self.n_sites,
+            "largest_max": self.largest_max,
+            "size_moments": list(self._size_moments),
+            "largest_moments": list(self._largest_moments),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """Restore an accumulator converted with `to_dict`."""
+        distribution = cls(data["bins_per_octave"])
+        distribution.counts[data["bins"]] = data["counts"]
+        distribution.n_lattices = data["n_lattices"]
+        distribution.n_sites = data["n_sites"]
+        distribution.largest_max = data["largest_max"]
+        distribution._size_moments = tuple(data["size_moments"])
+        distribution._largest_moments = tuple(data["largest_moments"])
+        return distribution
+
+
+if __name__ == "__main__":
+    import json
+    from hk import hoshen_kopelman
+    from gen_occupancy import gen_random_occupancy
+
+    print("=== Cluster Size Distribution Demo ===\n")
+
+    rng = np.random.default_rng(1)
+    workers = [ClusterSizeDistribution(), ClusterSizeDistribution()]
+    for i in range(20):
+        labels_lattice, _ = hoshen_kopelman(gen_random_occupancy((128, 128), 0.5927, rng))
+        workers[i % 2].update_labels(labels_lattice)
+
+    total = ClusterSizeDistribution.from_dict(json.loads(json.dumps(workers[0].to_dict())))
+    total.merge(workers[1])
+    print(f"{total.n_lattices} lattices, {total.n_clusters} clusters")
+    print(f"mean cluster size {total.mean_size:.2f} (variance {total.size_variance:.1f})")
+    print(f"largest cluster: mean {total.mean_largest:.0f}, max {total.largest_max}")
+    for s, n_s in zip(*total.density()):
+        print(f"  s ~ {s:8.1f}: n_s = {n_s:.3e}")
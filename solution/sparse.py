@@ -0,0 +1,176 @@
+"""Cluster labeling of dilute lattices given as lists of occupied sites.
+
+At low occupation probabilities almost every site of a lattice is empty,
+yet `pass1` and `replace_labels` visit all of them. `hoshen_kopelman_sparse`
+instead works on the occupied sites only, given by their coordinates or
+row-major linear indices, so that huge dilute lattices are never
+allocated.
+
+Sorted by linear index, horizontally neighboring sites are consecutive,
+so the runs of a row are found by comparing each site with the previous
+one. The site above a site is found by a binary search for its index
+minus the row length. Touching runs become merge pairs for
+`merge.get_representative_array`, like in `pass1_runs`.
+"""
+
+import numpy as np
+from merge import get_representative_array
+from streaming import final_labels, TOP, BOTTOM, LEFT, RIGHT
+from label_dtype import label_dtype
+
+
+def linear_indices(sites, shape):
+    """Convert occupied sites to row-major linear indices.
+
+    Parameters
+    ----------
+    sites : array_like
+        (N, 2) integer array of (row, col) coordinates, or 1D integer
+        array of linear indices ``row * cols + col``.
+    shape : tuple of int
+        Shape (rows, cols) of the lattice.
+
+    Returns
+    -------
+    numpy.ndarray
+        1D int64 array of linear indices.
+
+    Raises
+    ------
+    ValueError
+        If a site lies outside the lattice.
+    """
+    sites = np.asarray(sites, dtype=np.int64)
+    if sites.ndim == 2:
+        return np.ravel_multi_index((sites[:, 0], sites[:, 1]), shape)
+    if sites.ndim != 1:
+        raise ValueError("sites must be an (N, 2) array of coordinates or a 1D array of indices")
+    if len(sites) and (sites.min() < 0 or sites.max() >= shape[0] * shape[1]):
+        raise ValueError("linear index out of bounds")
+    return sites
+
+
+def hoshen_kopelman_sparse(sites, shape, dtype=None):
+    """Label the clusters of a lattice given by its occupied sites.
+
+    The work is proportional to the number of occupied sites (up to a
+    sort if they are not given in row-major order); no array of the
+    size of the lattice is allocated.
+
+    Parameters
+    ----------
+    sites : array_like
+        Occupied sites, as an (N, 2) integer array of (row, col)
+        coordinates or a 1D integer array of linear indices
+        ``row * cols + col``, in any order.
+    shape : tuple of int
+        Shape (rows, cols) of the lattice.
+    dtype : numpy.dtype, optional
+        Integer type of the labels. By default the smallest type that can
+        hold every label of the lattice is chosen (see `label_dtype.label_dtype`).
+
+    Returns
+    -------
+    site_labels : numpy.ndarray
+        1D array of the cluster label 1..n of each site, in the order of
+        `sites`.
+    cluster_flags : numpy.ndarray
+        1D int64 array of length n + 1; entry l combines the edge flags
+        `streaming.TOP`, `BOTTOM`, `LEFT` and `RIGHT` of the lattice edges
+        cluster l touches. A cluster spans left-right if it has both the
+        LEFT and RIGHT flag, see `spans_sparse`.
+
+    Raises
+    ------
+    ValueError
+        If a site lies outside the lattice or is given twice.
+    """
+    h, w = shape
+    index = linear_indices(sites, shape)
+    dtype = label_dtype(shape, dtype)
+    n = len(index)
+
+    order = None
+    if np.any(index[1:] <= index[:-1]):
+        order = np.argsort(index, kind="stable")
+        index = index[order]
+        if np.any(index[1:] == index[:-1]):
+            raise ValueError("sites must not contain duplicates")
+    rows, cols = np.divmod(index, w)
+
+    # a site continues the run of the previous site if it is its left neighbor
+    continues = np.zeros(n, dtype=bool)
+    continues[1:] = (index[1:] == index[:-1] + 1) & (cols[1:] != 0)
+    runs = np.cumsum(~continues)
+    n_runs = int(runs[-1]) if n else 0
+
+    above = np.minimum(np.searchsorted(index, index - w), max(n - 1, 0))
+    touching = (rows > 0) & (index[above] == index - w)
+    to_be_merged = np.stack((runs[touching], runs[above[touching]]), axis=1)
+
+    lookup, n_clusters = final_labels(get_representative_array(n_runs, to_be_merged))
+    site_labels = lookup.astype(dtype)[runs]
+
+    edge_flags = (
+        np.where(rows == 0, TOP, 0) | np.where(rows == h - 1, BOTTOM, 0)
+        | np.where(cols == 0, LEFT, 0) | np.where(cols == w - 1, RIGHT, 0)
+    )
+    on_edge = edge_flags != 0
+    cluster_flags = np.zeros(n_clusters + 1, dtype=np.int64)
+    np.bitwise_or.at(cluster_flags, site_labels[on_edge], edge_flags[on_edge])
+
+    if order is not None:
+        unsorted = np.empty_like(site_labels)
+        unsorted[order] = site_labels
+        site_labels = unsorted
+    return site_labels, cluster_flags
+
+
+def spans_sparse(cluster_flags, direction="lr"):
+    """Find the spanning clusters from the edge flags of `hoshen_kopelman_sparse`.
+
+    Parameters
+    ----------
+    cluster_flags : numpy.ndarray
+        Edge flags of each cluster.
+    direction : str, optional
+        "lr" (left-right) or "tb" (top-bottom). Default is "lr".
+
+    Returns
+    -------
+    numpy.ndarray
+        Labels of the clusters spanning in the given direction (empty if
+        the lattice does not percolate).
+
+    Raises
+    ------
+    ValueError
+        If direction is not "lr" or "tb".
+    """
+    if direction == "lr":
+        edges = LEFT | RIGHT
+    elif direction == "tb":
+        edges = TOP | BOTTOM
+    else:
+        raise ValueError("direction must be 'lr' or 'tb'")
+    return np.flatnonzero((cluster_flags & edges) == edges)
+
+
+if __name__ == "__main__":
+    print("=== Sparse Hoshen-Kopelman Demo ===\n")
+
+    sites = np.array([(0, 0), (0, 1), (1, 1), (2, 1), (2, 2), (2, 3), (2, 4), (3, 3), (0, 4)])
+    shape = (4, 5)
+    site_labels, cluster_flags = hoshen_kopelman_sparse(sites, shape)
+    for (y, x), label in zip(sites.tolist(), site_labels.tolist()):
+        print(f"site ({y}, {x}): cluster {label}")
+    print(f"spanning left-right: {spans_sparse(cluster_flags, 'lr')}, "
+          f"top-bottom: {spans_sparse(cluster_flags, 'tb')}")
+
+    # a 10^6 x 10^6 lattice at p = 10^-6, which could never be allocated densely
+    rng = np.random.default_rng(1)
+    shape = (10**6, 10**6)
+    index = np.unique(rng.integers(0, shape[0] * shape[1], 10**6))
+    site_labels, cluster_flags = hoshen_kopelman_sparse(index, shape)
+    print(f"\n{len(index)} occupied sites of a {shape[0]}x{shape[1]} lattice: "
+          f"{len(cluster_flags) - 1} clusters")
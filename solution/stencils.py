@@ -0,0 +1,113 @@
+"""Neighbor stencils defining the connectivity of a lattice.
+
+A stencil is the set of lattice vectors (dy, dx) connecting a site to its
+neighbors. Since connectivity is symmetric, a raster scan only needs the
+half of them pointing to sites visited earlier: those with dy < 0, or
+dy == 0 and dx < 0. `get_stencil` returns this "backward" half, sorted,
+as a tuple of (dy, dx) tuples. Named stencils:
+
+- ``4``: nearest neighbors of the square lattice (the default)
+- ``8``: nearest and next-nearest (diagonal) neighbors
+- ``"triangular"``: the triangular lattice (six neighbors), encoded on a
+  square array by connecting the up-left and down-right diagonal
+
+Any other connectivity can be given as a list of (dy, dx) offsets or as a
+centered boolean structure array like the one of `scipy.ndimage.label`.
+"""
+
+import numpy as np
+
+STENCILS = {
+    4: ((-1, 0), (0, -1)),
+    8: ((-1, -1), (-1, 0), (-1, 1), (0, -1)),
+    "triangular": ((-1, -1), (-1, 0), (0, -1)),
+}
+
+
+def get_stencil(connectivity=4):
+    """Normalize a connectivity to the backward half of its stencil.
+
+    Parameters
+    ----------
+    connectivity : int, str or array_like, optional
+        A name in `STENCILS`, an (N, 2) integer array of neighbor offsets
+        (dy, dx) (each offset implies its negative), or a boolean structure
+        array with odd side lengths centered on the site. Default is 4.
+
+    Returns
+    -------
+    tuple of tuple
+        Sorted backward offsets (dy, dx).
+
+    Raises
+    ------
+    ValueError
+        If the connectivity is not a known name or a valid stencil.
+    """
+    if isinstance(connectivity, (int, np.integer, str)):
+        if connectivity not in STENCILS:
+            raise ValueError(f"unknown connectivity {connectivity!r}, choose from {list(STENCILS)}")
+        return STENCILS[connectivity]
+
+    connectivity = np.asarray(connectivity)
+    if connectivity.dtype == bool:
+        if connectivity.ndim != 2 or not all(n % 2 for n in connectivity.shape):
+            raise ValueError("a structure must be a 2D boolean array with odd side lengths")
+        offsets = np.argwhere(connectivity) - np.array(connectivity.shape) // 2
+    else:
+        offsets = connectivity.astype(np.int64).reshape(-1, 2)
+
+    backward = set()
+    for dy, dx in offsets.tolist():
+        if (dy, dx) < (0, 0):
+            backward.add((dy, dx))
+        elif (dy, dx) > (0, 0):
+            backward.add((-dy, -dx))
+    if not backward:
+        raise ValueError("a stencil needs at least one non-zero offset")
+    return tuple(sorted(backward))
+
+
+def is_default(stencil):
+    """True if `stencil` is the 4-neighbor stencil of the original engines."""
+    return stencil == STENCILS[4]
+
+
+def joins_runs(stencil):
+    """True if horizontally adjacent sites are neighbors in `stencil`.
+
+    Only then do runs of occupied sites belong to one cluster each.
+    """
+    return (0, -1) in stencil
+
+
+def structure(stencil):
+    """Centered boolean structure array of a stencil.
+
+    Parameters
+    ----------
+    stencil : tuple of tuple
+        Backward offsets as returned by `get_stencil`.
+
+    Returns
+    -------
+    numpy.ndarray
+        2D boolean array of shape (2r + 1, 2r + 1), r being the largest
+        offset component, True at the center and at every neighbor.
+    """
+    r = max(max(abs(dy), abs(dx)) for dy, dx in stencil)
+    result = np.zeros((2 * r + 1, 2 * r + 1), dtype=bool)
+    result[r, r] = True
+    for dy, dx in stencil:
+        result[r + dy, r + dx] = result[r - dy, r - dx] = True
+    return result
+
+
+if __name__ == "__main__":
+    print("=== Neighbor Stencils ===\n")
+    for name in STENCILS:
+        print(f"{name}: backward offsets {get_stencil(name)}")
+        print(structure(get_stencil(name)).astype(int))
+    custom = [(0, 1), (1, 0), (0, 2), (2, 0)]
+    print(f"\ncustom {custom}: backward offsets {get_stencil(custom)}")
+    print(structure(get_stencil(custom)).astype(int))
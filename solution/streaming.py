@@ -0,0 +1,414 @@
+"""Out-of-core Hoshen-Kopelman labeling of lattices larger than RAM.
+
+The occupancy is read from a memory-mapped ``.npy`` file in blocks of
+rows. Only the labels of the previous row and the label-of-labels table
+(see `pass1.pass1_proper_labels`) are kept in memory; provisional labels
+are written block by block to a memory-mapped output file, and the final
+relabeling is done in a second sequential pass over that file.
+
+A run of occupied sites which touches a run in the row above takes over
+its label, so new labels are only handed out for runs which start a
+cluster. This keeps the label table much smaller than one entry per run.
+
+If only cluster statistics are needed, `cluster_stats` goes further and
+keeps memory proportional to the lattice width: clusters which do not
+reach the current row can no longer grow, so their statistics are final
+and their labels are recycled. It accepts any stencil (see `stencils`)
+whose neighbors lie in the same or the previous row.
+"""
+
+from collections import Counter
+
+import numpy as np
+from pass1_runs import (
+    find_runs, label_runs, label_run_bounds, merge_offsets, row_merge_pairs, shifted_merge_pairs,
+)
+from merge import uf_find, flatten, get_representative_array
+from label_dtype import label_dtype
+from stencils import get_stencil, is_default, joins_runs
+
+# edge flags accumulated per cluster by `cluster_stats`
+TOP, BOTTOM, LEFT, RIGHT = 1, 2, 4, 8
+
+
+def grow_table(label_of_labels, n_labels):
+    """Make room for `n_labels` entries in a label-of-labels table.
+
+    Parameters
+    ----------
+    label_of_labels : numpy.ndarray
+        1D integer table.
+    n_labels : int
+        Number of entries needed.
+
+    Returns
+    -------
+    numpy.ndarray
+        The table itself if it is large enough, otherwise a copy with at
+        least twice its size. New entries are uninitialized.
+    """
+    if n_labels <= len(label_of_labels):
+        return label_of_labels
+    grown = np.empty(max(n_labels, 2 * len(label_of_labels)), dtype=label_of_labels.dtype)
+    grown[:len(label_of_labels)] = label_of_labels
+    return grown
+
+
+def label_row(row, labels_above, label_of_labels, next_label, out):
+    """Label one row given the labels of the row above.
+
+    Every run of occupied sites takes over the proper label of a run it
+    touches in the row above; further touching runs are merged into it in
+    the label-of-labels table. Runs touching nothing above get a new label.
+
+    Parameters
+    ----------
+    row : numpy.ndarray
+        1D boolean occupancy of the row.
+    labels_above : numpy.ndarray
+        1D integer labels of the row above (0 = unoccupied).
+    label_of_labels : numpy.ndarray
+        Label-of-labels table; the larger of two merged proper labels
+        points to the smaller one.
+    next_label : int
+        Next unused label.
+    out : numpy.ndarray
+        1D integer array the labels of the row are written to.
+
+    Returns
+    -------
+    label_of_labels : numpy.ndarray
+        The (possibly reallocated) table.
+    next_label : int
+        Next unused label.
+    """
+    n_runs = label_runs(row, 1, out)
+    return adopt_labels(out, n_runs, row_merge_pairs(out, labels_above), label_of_labels, next_label)
+
+
+def adopt_labels(local_labels, n_local, pairs, label_of_labels, next_label):
+    """Replace local labels by provisional labels of the touching parts above.
+
+    Every local label takes over the proper label of a part it touches
+    in the previous row (or plane); further touching parts are merged
+    into it in the label-of-labels table. Local labels touching nothing
+    get a new label.
+
+    Parameters
+    ----------
+    local_labels : numpy.ndarray
+        Integer array of local labels 1..n_local (0 = unoccupied), which
+        is overwritten with the provisional labels.
+    n_local : int
+        Number of local labels.
+    pairs : numpy.ndarray
+        (N, 2) integer array of (local label, label above) pairs of
+        touching sites.
+    label_of_labels : numpy.ndarray
+        Label-of-labels table; the larger of two merged proper labels
+        points to the smaller one.
+    next_label : int
+        Next unused label.
+
+    Returns
+    -------
+    label_of_labels : numpy.ndarray
+        The (possibly reallocated) table.
+    next_label : int
+        Next unused label.
+    """
+    run_labels = np.zeros(n_local + 1, dtype=np.int64)
+
+    for run, above in pairs.tolist():
+        above = uf_find(label_of_labels, above)
+        current = run_labels[run]
+        if current == 0:
+            run_labels[run] = above
+            continue
+        current = uf_find(label_of_labels, current)
+        if current != above:
+            label_of_labels[max(current, above)] = min(current, above)
+        run_labels[run] = min(current, above)
+
+    new_runs = np.flatnonzero(run_labels == 0)[1:]
+    new_labels = np.arange(next_label, next_label + len(new_runs))
+    label_of_labels = grow_table(label_of_labels, next_label + len(new_runs))
+    label_of_labels[new_labels] = new_labels
+    run_labels[new_runs] = new_labels
+
+    local_labels[...] = run_labels[local_labels]
+    return label_of_labels, next_label + len(new_runs)
+
+
+def final_labels(label_of_labels):
+    """Resolve a label-of-labels table into contiguous final labels.
+
+    Parameters
+    ----------
+    label_of_labels : numpy.ndarray
+        Label-of-labels table of the used labels (entry 0 for label 0).
+
+    Returns
+    -------
+    lookup : numpy.ndarray
+        Array mapping every provisional label to a final label 1..n
+        (0 maps to 0).
+    n_clusters : int
+        Number of clusters n.
+    """
+    proper = flatten(label_of_labels)
+    is_root = proper == np.arange(len(proper))
+    is_root[0] = False
+    numbering = np.cumsum(is_root)
+    return numbering[proper], int(numbering[-1])
+
+
+def hoshen_kopelman_memmap(occ, out_path, block_rows=1024, dtype=None):
+    """Label connected clusters of a lattice stored in a ``.npy`` file.
+
+    Parameters
+    ----------
+    occ : str, numpy.ndarray or PackedOccupancy
+        Path of a ``.npy`` file holding a 2D boolean or integer occupancy
+        array, an already opened (memory-mapped) array, or a bit-packed
+        lattice, which is unpacked one block of rows at a time.
+    out_path : str
+        Path of the ``.npy`` file the labels are written to.
+    block_rows : int, optional
+        Number of rows read and written at a time. Default is 1024.
+    dtype : numpy.dtype, optional
+        Integer type of the label lattice. By default the smallest type
+        that can hold every label is chosen (see `label_dtype.label_dtype`).
+
+    Returns
+    -------
+    labels_lattice : numpy.memmap
+        Memory-mapped 2D integer array of cluster labels 1..n
+        (0 = unoccupied).
+    n_clusters : int
+        Number of clusters n.
+    """
+    if isinstance(occ, str):
+        occ = np.load(occ, mmap_mode="r")
+    h, w = occ.shape
+    dtype = label_dtype((h, w), dtype)
+    labels_lattice = np.lib.format.open_memmap(out_path, mode="w+", dtype=dtype, shape=(h, w))
+
+    label_of_labels = np.zeros(max(w, 1), dtype=np.int64)
+    next_label = 1
+    labels_above = np.zeros(w, dtype=dtype)
+
+    # 1st pass: provisional labels, block by block
+    for y0 in range(0, h, block_rows):
+        occ_block = np.asarray(occ[y0:y0 + block_rows], dtype=bool)
+        labels_block = np.empty(occ_block.shape, dtype=dtype)
+        for row, labels in zip(occ_block, labels_block):
+            label_of_labels, next_label = label_row(
+                row, labels_above, label_of_labels, next_label, labels
+            )
+            labels_above = labels
+        labels_lattice[y0:y0 + block_rows] = labels_block
+        labels_above = labels_above.copy()
+
+    # 2nd pass: final labels, block by block
+    lookup, n_clusters = final_labels(label_of_labels[:next_label])
+    lookup = lookup.astype(dtype)
+    for y0 in range(0, h, block_rows):
+        labels_lattice[y0:y0 + block_rows] = lookup[labels_lattice[y0:y0 + block_rows]]
+    labels_lattice.flush()
+
+    return labels_lattice, n_clusters
+
+
+def _finish_clusters(stats, sizes, flags):
+    """Add clusters which can no longer grow to the statistics."""
+    if len(sizes) == 0:
+        return
+    stats["n_clusters"] += len(sizes)
+    unique_sizes, counts = np.unique(sizes, return_counts=True)
+    stats["size_counts"].update(dict(zip(unique_sizes.tolist(), counts.tolist())))
+    stats["largest"] = max(stats["largest"], int(sizes.max()))
+    stats["spans_lr"] |= bool(np.any(flags & (LEFT | RIGHT) == LEFT | RIGHT))
+    stats["spans_tb"] |= bool(np.any(flags & (TOP | BOTTOM) == TOP | BOTTOM))
+
+
+def advance_row(row, labels_above, sizes, flags, row_flags=0, periodic=False, connectivity=4):
+    """Add one row to the clusters reaching the previous row.
+
+    Parameters
+    ----------
+    row : numpy.ndarray
+        1D boolean occupancy of the new row.
+    labels_above : numpy.ndarray
+        1D integer labels 1..k of the previous row (0 = unoccupied).
+    sizes : numpy.ndarray
+        Sizes of the k clusters reaching the previous row (entry 0 unused).
+    flags : numpy.ndarray
+        Edge flags of these clusters (entry 0 unused).
+    row_flags : int, optional
+        Flags given to every run of the new row, e.g. TOP for the first row.
+    periodic : bool, optional
+        If True, the first and last site of the row are neighbors.
+    connectivity : int, str or array_like, optional
+        Neighbor stencil, see `stencils.get_stencil`. Its neighbors must
+        lie in the same or the previous row. Default is 4.
+
+    Returns
+    -------
+    labels : numpy.ndarray
+        Labels 1..k' of the new row, numbered afresh.
+    sizes, flags : numpy.ndarray
+        Sizes and flags of the k' clusters reaching the new row.
+    finished_sizes, finished_flags : numpy.ndarray
+        Sizes and flags of the clusters which do not reach the new row
+        and therefore can no longer grow.
+
+    Raises
+    ------
+    ValueError
+        If the stencil reaches further back than the previous row, or is
+        combined with periodic boundaries.
+    """
+    stencil = get_stencil(connectivity)
+    if any(dy < -1 for dy, _ in stencil):
+        raise ValueError("streamed rows only support stencils reaching the previous row")
+    if periodic and not is_default(stencil):
+        raise ValueError("periodic rows only support 4-connectivity")
+    w = len(row)
+    # runs get the labels k + 1 .. k + n_runs after the k clusters above
+    k = len(sizes) - 1
+    labels = np.empty(w, dtype=np.int64)
+    if joins_runs(stencil):
+        starts, ends = find_runs(row)
+    else:
+        starts = np.flatnonzero(row)
+        ends = starts + 1
+    n_runs = label_run_bounds(starts, ends, k + 1, labels)
+    run_flags = np.full(n_runs, row_flags, dtype=np.int64)
+    if n_runs and starts[0] == 0:
+        run_flags[0] |= LEFT
+    if n_runs and ends[-1] == w:
+        run_flags[-1] |= RIGHT
+
+    # join the clusters above and the runs of this row into components
+    to_be_merged = [np.empty((0, 2), dtype=np.int64)] + [
+        shifted_merge_pairs(labels, labels if dy == 0 else labels_above, dx)
+        for dy, dx in merge_offsets(stencil)
+    ]
+    if periodic and w and labels[0] and labels[-1]:
+        to_be_merged.append([[labels[0], labels[-1]]])
+    representatives = get_representative_array(k + n_runs, np.concatenate(to_be_merged))
+    _, component = np.unique(representatives[1:], return_inverse=True)
+    n_components = int(component.max(initial=-1)) + 1
+    component_sizes = np.bincount(
+        component, weights=np.concatenate((sizes[1:], ends - starts)), minlength=n_components
+    ).astype(np.int64)
+    component_flags = np.zeros(n_components, dtype=np.int64)
+    np.bitwise_or.at(component_flags, component, np.concatenate((flags[1:], run_flags)))
+
+    alive = np.zeros(n_components, dtype=bool)
+    alive[component[k:]] = True
+
+    # recycle labels: the clusters reaching this row become 1..k'
+    new_labels = np.zeros(n_components + 1, dtype=np.int64)
+    new_labels[np.flatnonzero(alive) + 1] = np.arange(1, np.count_nonzero(alive) + 1)
+    labels = new_labels[np.concatenate(([0], component + 1))[labels]]
+    return (
+        labels,
+        np.concatenate(([0], component_sizes[alive])),
+        np.concatenate(([0], component_flags[alive])),
+        component_sizes[~alive],
+        component_flags[~alive],
+    )
+
+
+def cluster_stats(occ_row_iter, connectivity=4):
+    """Compute cluster statistics from a stream of occupancy rows.
+
+    Only the labels of the previous row and one size and edge-flag entry
+    per cluster reaching it are kept. After each row, the clusters which
+    the row does not touch are finished and the remaining ones are
+    renumbered 1..k (see `advance_row`), so labels are recycled and the
+    memory needed is proportional to the row length, independently of the
+    number of rows.
+
+    Parameters
+    ----------
+    occ_row_iter : iterable of array_like
+        Rows of a 2D occupancy lattice from top to bottom, each a 1D
+        boolean or integer array of the same length. May be a generator,
+        or a `packed.PackedOccupancy`, which yields its rows unpacked.
+    connectivity : int, str or array_like, optional
+        Neighbor stencil, see `advance_row`. Default is 4.
+
+    Returns
+    -------
+    dict
+        Statistics with the keys
+
+        - ``n_clusters``: number of clusters (int)
+        - ``size_counts``: number of clusters of each size (Counter)
+        - ``largest``: size of the largest cluster (int)
+        - ``spans_lr``: whether a cluster spans left to right (bool)
+        - ``spans_tb``: whether a cluster spans top to bottom (bool)
+        - ``n_rows``: number of rows read (int)
+
+    Raises
+    ------
+    ValueError
+        If the rows do not all have the same length, or the stencil
+        reaches further back than the previous row.
+    """
+    stencil = get_stencil(connectivity)
+    stats = {
+        "n_clusters": 0, "size_counts": Counter(), "largest": 0,
+        "spans_lr": False, "spans_tb": False, "n_rows": 0,
+    }
+    labels = None
+    # size and edge flags of the clusters reaching the previous row
+    sizes = np.zeros(1, dtype=np.int64)
+    flags = np.zeros(1, dtype=np.int64)
+
+    for row in occ_row_iter:
+        row = np.asarray(row, dtype=bool)
+        if labels is None:
+            labels = np.zeros(len(row), dtype=np.int64)
+        elif len(row) != len(labels):
+            raise ValueError("all rows must have the same length")
+
+        row_flags = TOP if stats["n_rows"] == 0 else 0
+        labels, sizes, flags, finished_sizes, finished_flags = advance_row(
+            row, labels, sizes, flags, row_flags, connectivity=stencil
+        )
+        _finish_clusters(stats, finished_sizes, finished_flags)
+        stats["n_rows"] += 1
+
+    _finish_clusters(stats, sizes[1:], flags[1:] | BOTTOM)
+    return stats
+
+
+if __name__ == "__main__":
+    import os
+    import tempfile
+
+    print("=== Out-of-core Hoshen-Kopelman Demo ===\n")
+
+    rng = np.random.default_rng(1)
+    with tempfile.TemporaryDirectory() as tmp:
+        occ_path = os.path.join(tmp, "occ.npy")
+        np.save(occ_path, rng.random((10, 12)) <= 0.55)
+
+        labels_lattice, n_clusters = hoshen_kopelman_memmap(
+            occ_path, os.path.join(tmp, "labels.npy"), block_rows=4
+        )
+        print("Occupancy grid:")
+        print(np.load(occ_path).astype(int))
+        print("\nFinal labels:")
+        print(np.asarray(labels_lattice))
+        print(f"\nResult: {n_clusters} clusters identified")
+        del labels_lattice
+
+    print("\nStatistics of 1000 rows of width 16, streamed from a generator:")
+    stats = cluster_stats(rng.random(16) <= 0.55 for _ in range(1000))
+    for key, value in stats.items():
+        print(f"  {key}: {value if key != 'size_counts' else dict(sorted(value.items())[:5])}")
@@ -2,21 +2,59 @@
 
 This module provides functions to estimate the percolation probability
 as a function of site occupation probability by running many random
-samples and checking for spanning clusters.
+samples and checking for spanning clusters. Sweeps can be distributed
+over a process pool with `parallel_spanning_probability`, and cluster
+size distributions are accumulated in constant memory with
+`cluster_size_distribution`.
 """
 
 import numpy as np
-from hk import hoshen_kopelman
-from percolate import percolates_lr, percolates_tb
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from hk import hoshen_kopelman, hoshen_kopelman_batch
+from percolate import percolates_lr, percolates_tb, spans
 from gen_occupancy import gen_random_occupancy
+from newman_ziff import spanning_occupations, binomial_convolution, n_elements
+from bond import gen_random_bonds, spans_bonds
+from size_distribution import ClusterSizeDistribution
+from periodic import hoshen_kopelman_periodic, wraps
+from stencils import get_stencil, is_default
 import matplotlib.pyplot as plt
 import matplotlib
 
-def estimate_spanning_probability(L, p_values, n_samples=200, direction="lr", seed=0):
+def estimate_spanning_probability(
+    L, p_values, n_samples=200, direction="lr", seed=0, method="spans", batch_size=64,
+    periodic=False, connectivity=4, model="site",
+):
     """Estimate spanning probability for different occupation probabilities.
 
     For each occupation probability p, generates n_samples random lattices
-    and counts the fraction that have a spanning cluster.
+    and counts the fraction that have a spanning cluster. By default only
+    the yes/no answer of `percolate.spans` is computed for each lattice;
+    ``method="hk"`` labels the full lattice instead and gives the same
+    result for the same seed.
+
+    With ``method="batch"`` the lattices are drawn batch_size at a time
+    with a single RNG call and labeled together with
+    `hk.hoshen_kopelman_batch`; the random stream, and hence the result,
+    is the same as for "spans" and "hk".
+
+    With ``method="newman_ziff"`` the lattices are instead filled site by
+    site in random order (see `newman_ziff`), and the whole curve follows
+    from n_samples fillings by binomial convolution, independently of the
+    number of p values.
+
+    With ``periodic=True`` the lattices are tori and the wrapping
+    probability is estimated instead: the fraction of lattices with a
+    cluster winding around the torus (see `periodic`). It approaches its
+    limit much faster with L than the spanning probability.
+
+    Other neighbor stencils than 4-connectivity (e.g. ``connectivity=8``,
+    see `stencils`) are supported by the "spans", "hk" and "batch"
+    methods on lattices with open boundaries.
+
+    With ``model="bond"`` every site is present and each bond is open
+    with probability p (see `bond`); the "spans", "hk" and "newman_ziff"
+    methods support it.
 
     Parameters
     ----------
@@ -31,6 +69,19 @@ def estimate_spanning_probability(L, p_values, n_samples=200, direction="lr", se
         Default is "lr".
     seed : int, optional
         Seed for the random number generator. Default is 0.
+    method : str, optional
+        "spans" (early-exit spanning check), "hk" (label every lattice
+        with `hoshen_kopelman`), "batch" or "newman_ziff". Default is "spans".
+    batch_size : int, optional
+        Number of lattices per batch for ``method="batch"``. Default is 64.
+    periodic : bool, optional
+        If True, estimate the wrapping probability on periodic lattices
+        with the "spans" or "hk" method; `direction` may then also be
+        "both" or "either" (see `periodic.wraps`). Default is False.
+    connectivity : int, str or array_like, optional
+        Neighbor stencil, see `stencils.get_stencil`. Default is 4.
+    model : str, optional
+        "site" (default) or "bond" percolation.
 
     Returns
     -------
@@ -40,31 +91,294 @@ def estimate_spanning_probability(L, p_values, n_samples=200, direction="lr", se
     Raises
     ------
     ValueError
-        If direction is not "lr" or "tb".
+        If direction is not "lr" or "tb", or method is unknown or does not
+        support periodic lattices, the connectivity or the model.
     """
     rng = np.random.default_rng(seed)
+    stencil = _check_options(method, periodic, connectivity, model)
+    if method == "newman_ziff":
+        spanning_n = spanning_occupations(L, n_samples, direction, rng, model)
+        return binomial_convolution(spanning_n, n_elements(L, model), p_values)
+    if method == "batch":
+        probs = []
+        for p in p_values:
+            count = 0
+            for start in range(0, n_samples, batch_size):
+                occ_stack = gen_random_occupancy((min(batch_size, n_samples - start), L, L), p, rng)
+                count += int(hoshen_kopelman_batch(occ_stack, direction, connectivity=stencil)[1].sum())
+            probs.append(count / n_samples)
+        return np.array(probs)
+    if method not in ("spans", "hk"):
+        raise ValueError("method must be 'spans', 'hk', 'batch' or 'newman_ziff'")
+
     probs = []
 
     for p in p_values:
         count = 0
         for _ in range(n_samples):
-            occ = gen_random_occupancy((L, L), p, rng)
-            labels_lattice, _ = hoshen_kopelman(occ)
-
-            if direction == "lr":
-                ok = percolates_lr(labels_lattice)
-            elif direction == "tb":
-                ok = percolates_tb(labels_lattice)
-            else:
-                raise ValueError("direction must be 'lr' or 'tb'")
-
-            count += int(ok)
+            count += int(_sample_spans(L, p, rng, direction, method, periodic, stencil, model))
 
         probs.append(count / n_samples)
 
     return np.array(probs)
 
 
+def _check_options(method, periodic, connectivity, model="site"):
+    """Validate the method options of a sweep and return the stencil."""
+    stencil = get_stencil(connectivity)
+    if model not in ("site", "bond"):
+        raise ValueError("model must be 'site' or 'bond'")
+    if model == "bond" and (periodic or method == "batch" or not is_default(stencil)):
+        raise ValueError("bond percolation needs method 'spans', 'hk' or 'newman_ziff', open boundaries "
+                         "and 4-connectivity")
+    if periodic and method not in ("spans", "hk"):
+        raise ValueError("periodic lattices need method 'spans' or 'hk'")
+    if not is_default(stencil) and (periodic or method == "newman_ziff"):
+        raise ValueError("periodic lattices and method 'newman_ziff' only support 4-connectivity")
+    return stencil
+
+
+def _is_spanning(occ, direction, method, periodic=False, connectivity=4):
+    """Check one lattice for spanning with the "spans" or "hk" method.
+
+    On periodic lattices, check for a cluster winding around the torus.
+    """
+    if periodic:
+        return wraps(hoshen_kopelman_periodic(occ)[1], direction)
+    if method == "spans":
+        return spans(occ, direction, connectivity)
+    labels_lattice, _ = hoshen_kopelman(occ, connectivity=connectivity)
+
+    if direction == "lr":
+        return percolates_lr(labels_lattice)
+    elif direction == "tb":
+        return percolates_tb(labels_lattice)
+    else:
+        raise ValueError("direction must be 'lr' or 'tb'")
+
+
+def _sample_spans(L, p, rng, direction, method, periodic, stencil, model):
+    """Draw one random L x L lattice and check it for spanning."""
+    if model == "bond":
+        return spans_bonds(*gen_random_bonds((L, L), p, rng), direction)
+    occ = gen_random_occupancy((L, L), p, rng)
+    return _is_spanning(occ, direction, method, periodic, stencil)
+
+
+def _sample_rng(seed, *key):
+    """Independent random stream of one sample, identified by `key`."""
+    return np.random.default_rng(np.random.SeedSequence(seed, spawn_key=key))
+
+
+def _count_spanning(task):
+    """Worker: count spanning lattices for one (L, p, sample block) task."""
+    i_L, L, i_p, p, start, stop, direction, seed, method, periodic, stencil, model = task
+    count = 0
+    for i in range(start, stop):
+        rng = _sample_rng(seed, L, i_p, i)
+        count += int(_sample_spans(L, p, rng, direction, method, periodic, stencil, model))
+    return i_L, i_p, count
+
+
+def _spanning_occupations_block(task):
+    """Worker: Newman-Ziff spanning occupations for one (L, sample block) task."""
+    i_L, L, start, stop, direction, seed, model = task
+    spanning_n = [
+        spanning_occupations(L, 1, direction, _sample_rng(seed, L, i), model)[0]
+        for i in range(start, stop)
+    ]
+    return i_L, spanning_n
+
+
+def _size_distribution_block(task):
+    """Worker: accumulate the cluster sizes of one sample block."""
+    L, p, start, stop, seed, bins_per_octave, stencil = task
+    distribution = ClusterSizeDistribution(bins_per_octave)
+    for i in range(start, stop):
+        occ = gen_random_occupancy((L, L), p, _sample_rng(seed, L, i))
+        labels_lattice, _ = hoshen_kopelman(occ, connectivity=stencil)
+        distribution.update_labels(labels_lattice)
+    return distribution
+
+
+def cluster_size_distribution(
+    L, p, n_samples=200, seed=0, n_workers=None, chunk_size=25, bins_per_octave=4, connectivity=4
+):
+    """Accumulate the cluster size distribution of many random lattices.
+
+    Every worker condenses the lattices of its sample block into a
+    `size_distribution.ClusterSizeDistribution`, and only these small
+    accumulators are sent back and merged, so the memory needed does not
+    grow with the number of samples. As in `parallel_spanning_probability`,
+    every sample has its own random stream and the result does not depend
+    on the number of workers or the chunk size (up to rounding of the
+    running moments).
+
+    Parameters
+    ----------
+    L : int
+        Linear size of the square lattice (L x L grid).
+    p : float
+        Occupation probability.
+    n_samples : int, optional
+        Number of random lattices. Default is 200.
+    seed : int, optional
+        Seed for the random streams of the samples. Default is 0.
+    n_workers : int, optional
+        Number of worker processes. Defaults to the number of CPUs; 0 runs
+        all tasks in the calling process.
+    chunk_size : int, optional
+        Number of samples per task. Default is 25.
+    bins_per_octave : int, optional
+        Number of histogram bins per factor of two in size. Default is 4.
+    connectivity : int, str or array_like, optional
+        Neighbor stencil defining the clusters, see `stencils.get_stencil`.
+        Default is 4.
+
+    Returns
+    -------
+    ClusterSizeDistribution
+        The accumulated statistics of all samples.
+    """
+    stencil = get_stencil(connectivity)
+    tasks = [
+        (L, p, start, min(start + chunk_size, n_samples), seed, bins_per_octave, stencil)
+        for start in range(0, n_samples, chunk_size)
+    ]
+    total = ClusterSizeDistribution(bins_per_octave)
+    if n_workers == 0:
+        for distribution in map(_size_distribution_block, tasks):
+            total.merge(distribution)
+        return total
+
+    with ProcessPoolExecutor(max_workers=n_workers) as executor:
+        for distribution in executor.map(_size_distribution_block, tasks):
+            total.merge(distribution)
+    return total
+
+
+def parallel_spanning_probability(
+    L_list,
+    p_values,
+    n_samples=200,
+    direction="lr",
+    seeds=0,
+    method="spans",
+    n_workers=None,
+    chunk_size=25,
+    ordered=True,
+    periodic=False,
+    connectivity=4,
+    model="site",
+):
+    """Estimate spanning probabilities for several lattice sizes in parallel.
+
+    The work is split into (L, p, sample block) tasks (for "newman_ziff":
+    (L, sample block)) which are run in a process pool. Every sample draws
+    from its own random stream, spawned with `numpy.random.SeedSequence`
+    from the seed of its lattice size and its (L, p index, sample index),
+    so the result depends neither on the number of workers nor on the chunk
+    size, and different sizes draw independent lattices even if they share
+    a seed. The streams differ from the single stream used by
+    `estimate_spanning_probability`, so the two agree only statistically.
+
+    Parameters
+    ----------
+    L_list : sequence of int
+        Linear sizes of the square lattices.
+    p_values : array_like
+        Array of occupation probabilities to test.
+    n_samples : int, optional
+        Number of random samples per (L, p). Default is 200.
+    direction : str, optional
+        Direction to check for percolation: "lr" or "tb". Default is "lr".
+    seeds : int or sequence of int, optional
+        Seed per lattice size, or a single seed shared by all sizes. The
+        lattice size is part of every sample's stream key, so sizes sharing
+        a seed still get independent streams. Default is 0.
+    method : str, optional
+        "spans", "hk" or "newman_ziff", see `estimate_spanning_probability`.
+        Default is "spans".
+    n_workers : int, optional
+        Number of worker processes. Defaults to the number of CPUs; 0 runs
+        all tasks in the calling process.
+    chunk_size : int, optional
+        Number of samples per task. Default is 25.
+    ordered : bool, optional
+        If True (default), results are aggregated in task order; otherwise
+        as soon as each task completes. Both give the same result.
+    periodic : bool, optional
+        If True, estimate wrapping probabilities on periodic lattices, see
+        `estimate_spanning_probability`. Default is False.
+    connectivity : int, str or array_like, optional
+        Neighbor stencil, see `estimate_spanning_probability`. Default is 4.
+    model : str, optional
+        "site" (default) or "bond" percolation, see
+        `estimate_spanning_probability`.
+
+    Returns
+    -------
+    numpy.ndarray
+        Array of shape (len(L_list), len(p_values)) of spanning probabilities.
+
+    Raises
+    ------
+    ValueError
+        If method is unknown or does not support periodic lattices, the
+        connectivity or the model.
+    """
+    stencil = _check_options(method, periodic, connectivity, model)
+    p_values = np.asarray(p_values, dtype=float)
+    seeds = np.broadcast_to(seeds, (len(L_list),)).tolist()
+    blocks = [(start, min(start + chunk_size, n_samples)) for start in range(0, n_samples, chunk_size)]
+
+    if method == "newman_ziff":
+        worker = _spanning_occupations_block
+        tasks = [
+            (i_L, L, start, stop, direction, seeds[i_L], model)
+            for i_L, L in enumerate(L_list) for start, stop in blocks
+        ]
+    elif method in ("spans", "hk"):
+        worker = _count_spanning
+        tasks = [
+            (i_L, L, i_p, p, start, stop, direction, seeds[i_L], method, periodic, stencil, model)
+            for i_L, L in enumerate(L_list)
+            for i_p, p in enumerate(p_values.tolist())
+            for start, stop in blocks
+        ]
+    else:
+        raise ValueError("method must be 'spans', 'hk' or 'newman_ziff'")
+
+    if n_workers == 0:
+        results = map(worker, tasks)
+        executor = None
+    else:
+        executor = ProcessPoolExecutor(max_workers=n_workers)
+        if ordered:
+            results = executor.map(worker, tasks)
+        else:
+            results = (future.result() for future in as_completed(
+                [executor.submit(worker, task) for task in tasks]))
+
+    try:
+        if method == "newman_ziff":
+            spanning_n = [[] for _ in L_list]
+            for i_L, block in results:
+                spanning_n[i_L].extend(block)
+            return np.array([
+                binomial_convolution(spanning_n[i_L], n_elements(L, model), p_values)
+                for i_L, L in enumerate(L_list)
+            ])
+
+        counts = np.zeros((len(L_list), len(p_values)), dtype=np.int64)
+        for i_L, i_p, count in results:
+            counts[i_L, i_p] += count
+        return counts / n_samples
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+
 def sweep_and_plot(
     L_list=(16, 32, 64, 128, 256),
     p_min=0.52,
@@ -73,6 +387,8 @@ def sweep_and_plot(
     n_samples=100,
     direction="lr",
     seed=0,
+    method="spans",
+    n_workers=None,
 ):
     """Run percolation sweep for multiple system sizes and plot results.
 
@@ -96,6 +412,13 @@ def sweep_and_plot(
         Direction to check for percolation: "lr" or "tb". Default is "lr".
     seed : int, optional
         Base seed for random number generation. Default is 0.
+    method : str, optional
+        Estimation method passed to `estimate_spanning_probability`:
+        "spans", "hk", "batch" or "newman_ziff". Default is "spans".
+    n_workers : int, optional
+        If given, all lattice sizes are run together in a process pool
+        with this many workers (see `parallel_spanning_probability`).
+        Default is None (serial).
 
     Notes
     -----
@@ -105,13 +428,27 @@ def sweep_and_plot(
     matplotlib.rcParams.update({"font.size": 20})
     p_values = np.linspace(p_min, p_max, n_p)
 
-    plt.figure(figsize=(12,9))
-    for i, L in enumerate(L_list):
-        print(f"Running L={L}...", end=" ", flush=True)
-        P = estimate_spanning_probability(
-            L, p_values, n_samples=n_samples, direction=direction, seed=seed + 1000 * i
+    seeds = [seed + 1000 * i for i in range(len(L_list))]
+
+    if n_workers is not None:
+        print(f"Running L={tuple(L_list)} on {n_workers} workers...", end=" ", flush=True)
+        P_all = parallel_spanning_probability(
+            L_list, p_values, n_samples=n_samples, direction=direction, seeds=seeds,
+            method=method, n_workers=n_workers,
         )
         print("done")
+
+    plt.figure(figsize=(12,9))
+    for i, L in enumerate(L_list):
+        if n_workers is not None:
+            P = P_all[i]
+        else:
+            print(f"Running L={L}...", end=" ", flush=True)
+            P = estimate_spanning_probability(
+                L, p_values, n_samples=n_samples, direction=direction, seed=seeds[i],
+                method=method,
+            )
+            print("done")
         plt.plot(p_values, P, linewidth=2, markersize=5, label=f"L={L}")
 
     plt.xlabel("occupation probability p")
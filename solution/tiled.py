@@ -0,0 +1,209 @@
+"""Domain-decomposition labeling of large lattices.
+
+The lattice is split into a grid of tiles which are labeled independently
+(in a process pool) with one of the registered backends. The tile labels
+are shifted by per-tile offsets into one global label range, and only the
+seams between neighboring tiles are inspected: every pair of touching
+sites across a seam becomes a merge pair for the global union-find
+(`merge.get_representative_array`), exactly like the merge pairs of
+`pass1`. The final relabeling is again done per tile in parallel.
+
+Occupancy and labels live in `shared_lattice.SharedLattice` buffers:
+the workers attach to them by name, read their occupancy tile and write
+their label slab in place, so no lattice data is pickled.
+"""
+
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from backends import get_backend
+from merge import get_representative_array
+from renumber_labels import renumber_labels
+from replace_labels import replace_labels
+from shared_lattice import SharedLattice, attach
+from label_dtype import label_dtype
+
+
+def tile_grid(shape, tiles):
+    """Number of tiles along (rows, cols), so that no tile is empty.
+
+    Parameters
+    ----------
+    shape : tuple of int
+        Shape of the lattice (rows, cols).
+    tiles : int or tuple of int
+        Requested number of tiles along (rows, cols); a single int is
+        used for both.
+
+    Returns
+    -------
+    tuple of int
+        Number of tiles along (rows, cols), at most the lattice extent.
+    """
+    return tuple(
+        max(1, min(int(n), extent)) for n, extent in zip(np.broadcast_to(tiles, (2,)), shape)
+    )
+
+
+def tile_bounds(shape, tiles):
+    """Compute the bounds of a grid of tiles covering a lattice.
+
+    Parameters
+    ----------
+    shape : tuple of int
+        Shape of the lattice (rows, cols).
+    tiles : int or tuple of int
+        Number of tiles along (rows, cols); a single int is used for both.
+
+    Returns
+    -------
+    list of tuple
+        (y0, y1, x0, x1) bounds of each tile, row-major over the tile grid.
+    """
+    n_y, n_x = tile_grid(shape, tiles)
+    ys = np.linspace(0, shape[0], n_y + 1).astype(int)
+    xs = np.linspace(0, shape[1], n_x + 1).astype(int)
+    return [
+        (ys[i], ys[i + 1], xs[j], xs[j + 1])
+        for i in range(n_y) for j in range(n_x)
+    ]
+
+
+def _label_tile(task):
+    """Worker: label one tile with contiguous labels 1..k into its slab."""
+    occ_spec, labels_spec, (y0, y1, x0, x1), backend = task
+    with attach(occ_spec, writable=False) as occ, attach(labels_spec) as labels_lattice:
+        occ_tile = occ[y0:y1, x0:x1]
+        backend = get_backend(backend, occ_tile.shape)
+        labels_tile, unique_labels = backend["label"](occ_tile)
+        if "contiguous_labels" not in backend["capabilities"]:
+            labels_tile = renumber_labels(labels_tile, sorted(unique_labels), inplace=True)
+        labels_lattice[y0:y1, x0:x1] = labels_tile
+    return len(unique_labels)
+
+
+def _relabel_tile(task):
+    """Worker: map the local labels of one slab to final labels in place."""
+    labels_spec, (y0, y1, x0, x1), lookup = task
+    with attach(labels_spec) as labels_lattice:
+        replace_labels(labels_lattice[y0:y1, x0:x1], lookup, inplace=True)
+
+
+def seam_merge_pairs(labels_tiles, offsets, grid):
+    """Collect merge pairs of touching sites across tile seams.
+
+    Parameters
+    ----------
+    labels_tiles : list of numpy.ndarray
+        Local labels (0 = unoccupied) of each tile, row-major over the
+        tile grid as returned by `tile_bounds`.
+    offsets : array_like
+        Offset added to the local labels of each tile to make them global.
+    grid : tuple of int
+        Number of tiles along (rows, cols), see `tile_grid`.
+
+    Returns
+    -------
+    numpy.ndarray
+        (N, 2) integer array of global labels that need to be merged.
+    """
+    n_y, n_x = grid
+    pairs = [np.empty((0, 2), dtype=np.int64)]
+
+    def add_pairs(a, offset_a, b, offset_b):
+        touching = (a != 0) & (b != 0)
+        pairs.append(np.stack((a[touching] + offset_a, b[touching] + offset_b), axis=1))
+
+    for i in range(n_y):
+        for j in range(n_x):
+            k = i * n_x + j
+            tile = labels_tiles[k]
+            if i + 1 < n_y:
+                add_pairs(tile[-1, :], offsets[k], labels_tiles[k + n_x][0, :], offsets[k + n_x])
+            if j + 1 < n_x:
+                add_pairs(tile[:, -1], offsets[k], labels_tiles[k + 1][:, 0], offsets[k + 1])
+    return np.concatenate(pairs)
+
+
+def hoshen_kopelman_tiled(occ, tiles=(2, 2), backend="auto", n_workers=None, out=None, dtype=None):
+    """Label connected clusters by labeling tiles independently.
+
+    Parameters
+    ----------
+    occ : array_like or SharedLattice
+        2D boolean or integer array where True/non-zero indicates occupied
+        sites. A boolean `SharedLattice` is used without copying.
+    tiles : int or tuple of int, optional
+        Number of tiles along (rows, cols). Default is (2, 2).
+    backend : str, optional
+        Backend used to label each tile (see `backends.list_backends`).
+        Default is "auto".
+    n_workers : int, optional
+        Number of worker processes. Defaults to the number of CPUs; 0
+        labels all tiles in the calling process.
+    out : SharedLattice, optional
+        Integer lattice the labels are written to. By default a temporary
+        shared lattice is used and copied to a regular array at the end.
+    dtype : numpy.dtype, optional
+        Integer type of the label lattice if `out` is not given. By default the smallest type
+        that can hold every label is chosen (see `label_dtype.label_dtype`).
+
+    Returns
+    -------
+    labels_lattice : numpy.ndarray
+        2D integer array where each occupied site is labeled with its cluster ID.
+        Unoccupied sites have label 0. This is ``out.array`` if `out` is given.
+    unique_labels : set
+        Set of unique cluster labels (excluding 0).
+    """
+    owned = []
+    if not isinstance(occ, SharedLattice):
+        occ = SharedLattice.from_array(np.asarray(occ, dtype=bool))
+        owned.append(occ)
+    shape = occ.array.shape
+    if out is None:
+        out = SharedLattice(shape, label_dtype(shape, dtype))
+        owned.append(out)
+
+    bounds = tile_bounds(shape, tiles)
+    executor = ProcessPoolExecutor(max_workers=n_workers) if n_workers != 0 else None
+    mapper = executor.map if executor is not None else map
+
+    try:
+        tasks = [(occ.spec, out.spec, tile, backend) for tile in bounds]
+        counts = list(mapper(_label_tile, tasks))
+
+        # tile k owns the global labels offsets[k] + 1 .. offsets[k + 1]
+        offsets = np.concatenate(([0], np.cumsum(counts)))
+        labels_tiles = [out.array[y0:y1, x0:x1] for y0, y1, x0, x1 in bounds]
+        to_be_merged = seam_merge_pairs(labels_tiles, offsets, tile_grid(shape, tiles))
+        representative_labels = get_representative_array(int(offsets[-1]), to_be_merged)
+
+        # each tile only needs the part of the lookup array covering its labels
+        tasks = [
+            (out.spec, tile, np.concatenate(([0], representative_labels[offset + 1:offset + n + 1])))
+            for tile, n, offset in zip(bounds, counts, offsets)
+        ]
+        list(mapper(_relabel_tile, tasks))
+
+        labels_lattice = out.array if out not in owned else np.array(out.array)
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+        for lattice in owned:
+            lattice.close()
+
+    return labels_lattice, set(np.unique(representative_labels[1:]).tolist())
+
+
+if __name__ == "__main__":
+    print("=== Tiled Hoshen-Kopelman Demo ===\n")
+
+    rng = np.random.default_rng(1)
+    occ = rng.random((12, 12)) <= 0.55
+    labels_lattice, unique_labels = hoshen_kopelman_tiled(occ, tiles=(2, 3), n_workers=2)
+
+    print("Occupancy grid:")
+    print(occ.astype(int))
+    print("\nFinal labels (2x3 tiles):")
+    print(labels_lattice)
+    print(f"\nResult: {len(unique_labels)} clusters identified")